@@ -0,0 +1,135 @@
+import json
+import pandas as pd
+from local_store import get_connection, ensure_schema
+
+# Aggregates behind the Analytics tab. Classification runs hand over the
+# rows they classified; analytics_content keeps the latest numbers per
+# video / reel and analytics_totals holds the sums per platform, month,
+# assignment type and creator. Only the months touched by a run are summed
+# again, and every update bumps the data version the app caches on.
+
+# Per platform: columns of the classification frame behind each field
+SOURCES = {
+    "youtube": {"url": "Video URL", "date": "Publish Date", "creator": "Channel Name"},
+    "instagram": {"url": "Reel URL", "date": "Date", "creator": "Username"},
+}
+
+COUNTS = ("views", "likes", "comments", "shares")
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS analytics_content (
+        platform TEXT NOT NULL,
+        url TEXT NOT NULL,
+        month TEXT NOT NULL,
+        assignment TEXT NOT NULL,
+        creator TEXT NOT NULL,
+        views INTEGER NOT NULL,
+        likes INTEGER NOT NULL,
+        comments INTEGER NOT NULL,
+        shares INTEGER NOT NULL,
+        PRIMARY KEY (platform, url)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS analytics_content_month ON analytics_content (platform, month)",
+    """
+    CREATE TABLE IF NOT EXISTS analytics_totals (
+        platform TEXT NOT NULL,
+        month TEXT NOT NULL,
+        assignment TEXT NOT NULL,
+        creator TEXT NOT NULL,
+        items INTEGER NOT NULL,
+        views INTEGER NOT NULL,
+        likes INTEGER NOT NULL,
+        comments INTEGER NOT NULL,
+        shares INTEGER NOT NULL,
+        PRIMARY KEY (platform, month, assignment, creator)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analytics_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO analytics_version (id, version) VALUES (1, 0)"
+)
+
+
+def _connection():
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    return conn
+
+
+def _counts(df, column):
+    if column not in df:
+        return pd.Series(0, index=df.index)
+    return pd.to_numeric(df[column], errors="coerce").fillna(0).astype("int64")
+
+
+# Upserts the rows of a classification frame (typed by its schema) and
+# refreshes the totals of the months they fall in now or fell in before.
+# Returns the row count.
+def update(platform, df, assignment_column):
+    spec = SOURCES[platform]
+    if df.empty:
+        return 0
+    assignment = df[assignment_column].astype(str).str.strip().str.lower()
+    frame = pd.DataFrame({
+        "url": df[spec["url"]].astype(str),
+        "month": df[spec["date"]].dt.strftime("%Y-%m").fillna("unknown"),
+        "assignment": assignment.where(~assignment.isin(["", "nan", "none"]), "unassigned"),
+        "creator": df[spec["creator"]].astype(str) if spec["creator"] in df else "",
+        **{count: _counts(df, count.capitalize()) for count in COUNTS},
+    })
+    frame = frame[frame["url"] != ""].drop_duplicates("url", keep="last")
+    conn = _connection()
+    with conn:
+        # Write lock first: the read below decides what gets summed again
+        conn.execute("BEGIN IMMEDIATE")
+        # Months the items were in before, so an item whose month changed is
+        # also taken out of its old month's totals
+        previous = conn.execute(
+            "SELECT DISTINCT month FROM analytics_content WHERE platform = ? AND url IN (SELECT value FROM json_each(?))",
+            (platform, json.dumps(frame["url"].tolist()))
+        ).fetchall()
+        months = sorted(set(frame["month"]) | {month for month, in previous})
+        conn.executemany(
+            f"INSERT OR REPLACE INTO analytics_content (platform, url, month, assignment, creator, {', '.join(COUNTS)}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(platform, *row) for row in frame.itertuples(index=False, name=None)]
+        )
+        in_months = f"month IN ({', '.join('?' * len(months))})"
+        conn.execute(f"DELETE FROM analytics_totals WHERE platform = ? AND {in_months}", (platform, *months))
+        conn.execute(
+            f"INSERT INTO analytics_totals (platform, month, assignment, creator, items, {', '.join(COUNTS)}) "
+            f"SELECT platform, month, assignment, creator, COUNT(*), {', '.join(f'SUM({c})' for c in COUNTS)} "
+            f"FROM analytics_content WHERE platform = ? AND {in_months} GROUP BY platform, month, assignment, creator",
+            (platform, *months)
+        )
+        conn.execute("UPDATE analytics_version SET version = version + 1 WHERE id = 1")
+    return len(frame)
+
+
+def data_version():
+    return _connection().execute("SELECT version FROM analytics_version WHERE id = 1").fetchone()[0]
+
+
+# All totals, with engagement (likes + comments + shares) per row
+def totals():
+    df = pd.read_sql_query("SELECT * FROM analytics_totals", _connection())
+    df["engagement"] = df["likes"] + df["comments"] + df["shares"]
+    return df
+
+
+# Totals summed over one dimension ("month", "assignment", "creator" or
+# "platform"), largest views first, optionally limited to some platforms
+def grouped(df, dimension, platforms=None):
+    if platforms:
+        df = df[df["platform"].isin(platforms)]
+    measures = ["items", "views", "engagement", *COUNTS[1:]]
+    result = df.groupby(dimension, sort=False)[measures].sum()
+    if dimension == "month":
+        return result.sort_index()
+    return result.sort_values("views", ascending=False)
@@ -0,0 +1,118 @@
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from ingest import COUNT, DATETIME, coerce_frame
+from records import REEL_SCHEMA, VIDEO_SCHEMA, VIDEO_STATS_SCHEMA, columns as record_columns
+
+# Local Parquet archive of everything discovery found, so history survives
+# the sheet being rewritten and analysis does not have to download the tabs.
+# Layout (hive partitioning, pruned on read):
+#   <LPU_ARCHIVE_DIR>/platform=<youtube|instagram>/month=<YYYY-MM>/<snapshot>-<id>.parquet
+# Files are partitioned by publish month and never rewritten; every row
+# carries the snapshot_at of the run that saw it, so repeated discoveries of
+# the same video build a time series of its metrics.
+
+DEFAULT_ARCHIVE_DIR = "lpu_archive"
+
+# Per platform: key column, publish date column, archived columns and the
+# types of the non-text ones. Only the scraped columns are archived; analyst
+# columns stay in the sheet.
+ARCHIVES = {
+    "youtube": {
+        "key": "Video URL",
+        "date": "Publish Date",
+        "columns": record_columns(VIDEO_SCHEMA) + record_columns(VIDEO_STATS_SCHEMA)[1:],
+        "schema": {"Publish Date": DATETIME, "Views": COUNT, "Likes": COUNT, "Comments": COUNT},
+    },
+    "instagram": {
+        "key": "Reel URL",
+        "date": "Date",
+        "columns": record_columns(REEL_SCHEMA),
+        "schema": {"Date": DATETIME, "Views": COUNT, "Likes": COUNT, "Comments": COUNT},
+    },
+}
+
+
+def archive_dir():
+    return os.environ.get("LPU_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+
+def _platform_dir(platform):
+    return os.path.join(archive_dir(), f"platform={platform}")
+
+
+# Appends one discovery run; returns the number of files written
+def append(platform, df, snapshot_at=None):
+    if df.empty:
+        return 0
+    spec = ARCHIVES[platform]
+    snapshot_at = snapshot_at or pd.Timestamp.now(tz="UTC")
+    frame, _ = coerce_frame(df.copy(), spec["schema"])
+    for column in frame.columns:
+        if column not in spec["schema"]:
+            frame[column] = frame[column].astype("string")
+    frame["snapshot_at"] = snapshot_at
+    months = frame[spec["date"]].dt.strftime("%Y-%m").fillna("unknown")
+    written = 0
+    for month, part in frame.groupby(months, sort=False):
+        directory = os.path.join(_platform_dir(platform), f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{snapshot_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        part.to_parquet(path, index=False)
+        written += 1
+    return written
+
+
+# No rows, but the columns and dtypes read() returns for the platform
+def _empty(spec, columns=None):
+    dtypes = {DATETIME: "datetime64[us, UTC]", COUNT: "Int64"}
+    wanted = columns or [*spec["columns"], "snapshot_at"]
+    return pd.DataFrame({
+        column: pd.Series(dtype=dtypes[DATETIME] if column == "snapshot_at" else dtypes.get(spec["schema"].get(column), "string"))
+        for column in wanted
+    })
+
+
+# Archived rows published in the last `days_back` days (all if None). Only
+# the month partitions that can hold the window are opened. With
+# latest=True each key keeps its most recent snapshot. The key column is
+# always present, also when nothing was archived.
+def read(platform, days_back=None, latest=True, columns=None):
+    spec = ARCHIVES[platform]
+    directory = _platform_dir(platform)
+    wanted = None
+    if columns is not None:
+        wanted = list(dict.fromkeys([*columns, spec["key"], "snapshot_at"]))
+    if not os.path.isdir(directory):
+        return _empty(spec, wanted)
+    dataset = ds.dataset(directory, format="parquet",
+                         partitioning=ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive"))
+    condition = None
+    if days_back is not None:
+        start = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days_back)
+        condition = (ds.field("month") >= start.strftime("%Y-%m")) & (ds.field("month") != "unknown")
+        condition &= ds.field(spec["date"]) >= pa.scalar(start.to_pydatetime(), pa.timestamp("us", tz="UTC"))
+    df = dataset.to_table(columns=wanted, filter=condition).to_pandas()
+    if df.empty:
+        return _empty(spec, wanted)
+    df = df.drop(columns=["month"], errors="ignore")
+    for column, kind in spec["schema"].items():
+        if column in df and kind == COUNT:
+            df[column] = df[column].astype("Int64")
+    if latest and not df.empty:
+        df = df.sort_values("snapshot_at", kind="stable").drop_duplicates(spec["key"], keep="last")
+    return df.reset_index(drop=True)
+
+
+# Archived rows joined with analyst columns read from the sheet (see
+# ingest.read_columns); rows the sheet does not have get blanks.
+def join_sheet_columns(df, sheet_columns, key):
+    if sheet_columns.empty or key not in sheet_columns:
+        return df
+    sheet_columns = sheet_columns[sheet_columns[key] != ""].drop_duplicates(key)
+    added = [column for column in sheet_columns.columns if column != key]
+    merged = df.drop(columns=[column for column in added if column in df]).merge(sheet_columns, on=key, how="left")
+    merged[added] = merged[added].fillna("")
+    return merged
@@ -0,0 +1,292 @@
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from gspread.utils import a1_to_rowcol
+
+# Offline stand-ins for the YouTube Data API, ApifyClient and a gspread
+# Spreadsheet, with just the surface the pipelines use. Every fake counts its
+# API calls by method name and can add latency and inject failures:
+#   latency        seconds slept per call
+#   failure_rate   probability that a call raises FakeAPIError
+#   seed           makes generated data and failures reproducible
+
+
+# Looks like a 503 to concurrency.is_retryable, so the pipelines back off
+class FakeAPIError(Exception):
+    status_code = 503
+
+
+class _Fake:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise FakeAPIError(f"injected failure in {method}")
+
+
+class _Request:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class _Resource:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+# --- YouTube Data API v3 ---
+
+# Each keyword matches `videos_per_keyword` videos, published over the last
+# `days` days; consecutive keywords share `overlap` of their videos.
+class FakeYouTube(_Fake):
+    def __init__(self, videos_per_keyword=100, overlap=0.1, days=30, **kwargs):
+        super().__init__(**kwargs)
+        self.videos_per_keyword = videos_per_keyword
+        self.overlap = overlap
+        self.days = days
+        self.now = datetime.utcnow()
+        self._keywords = {}
+        self._results = {}
+
+    def _keyword_videos(self, keyword):
+        with self._lock:
+            index = self._keywords.setdefault(keyword, len(self._keywords))
+        start = int(index * self.videos_per_keyword * (1 - self.overlap))
+        return range(start, start + self.videos_per_keyword)
+
+    def _published(self, number):
+        return self.now - timedelta(seconds=(number * 7919) % (self.days * 86400))
+
+    # Result list per query, so paging through it stays cheap
+    def _matching(self, q, published_after, order):
+        key = (q, published_after, order)
+        if key not in self._results:
+            after = datetime.fromisoformat(published_after.replace("Z", "")) if published_after else None
+            numbers = [n for n in self._keyword_videos(q) if after is None or self._published(n) >= after]
+            if order == "date":
+                numbers.sort(key=self._published, reverse=True)
+            with self._lock:
+                self._results[key] = numbers
+        return self._results[key]
+
+    def search(self):
+        def list_(q, publishedAfter=None, pageToken=None, maxResults=5, order="relevance", **_):
+            def execute():
+                self._call("search.list")
+                numbers = self._matching(q, publishedAfter, order)
+                offset = int(pageToken or 0)
+                page = numbers[offset:offset + maxResults]
+                response = {"items": [{
+                    "id": {"videoId": f"vid{n:08d}"},
+                    "snippet": {
+                        "channelTitle": f"Channel {n % 97}",
+                        "title": f"Video {n} about {q}",
+                        "publishedAt": self._published(n).strftime("%Y-%m-%dT%H:%M:%SZ")
+                    }
+                } for n in page]}
+                if offset + maxResults < len(numbers):
+                    response["nextPageToken"] = str(offset + maxResults)
+                return response
+            return _Request(execute)
+        return _Resource(list=list_)
+
+    def videos(self):
+        def list_(id, part="statistics", **_):
+            def execute():
+                self._call("videos.list")
+                items = []
+                for video_id in id.split(","):
+                    n = int(video_id[3:]) if video_id.startswith("vid") else hash(video_id) % 10**6
+                    items.append({
+                        "id": video_id,
+                        "statistics": {"viewCount": str(n * 37 % 100000), "likeCount": str(n * 13 % 5000),
+                                       "commentCount": str(n * 7 % 400)},
+                        "contentDetails": {"duration": "PT45S" if n % 3 else "PT12M30S"}
+                    })
+                return {"items": items}
+            return _Request(execute)
+        return _Resource(list=list_)
+
+
+# --- Apify ---
+
+# Every profile or hashtag run returns `posts_per_source` posts spread over
+# the last `days` days; items stream from the dataset one by one.
+class FakeApify(_Fake):
+    def __init__(self, posts_per_source=50, days=30, **kwargs):
+        super().__init__(**kwargs)
+        self.posts_per_source = posts_per_source
+        self.days = days
+        self.now = datetime.utcnow()
+        self._runs = {}
+
+    def actor(self, actor_id):
+        def start(run_input, **_):
+            self._call("actor.start")
+            with self._lock:
+                run_id = f"run{len(self._runs)}"
+                self._runs[run_id] = run_input
+            return {"id": run_id, "defaultDatasetId": run_id}
+        return _Resource(start=start)
+
+    def run(self, run_id):
+        def wait_for_finish(**_):
+            self._call("run.wait_for_finish")
+            return {"id": run_id, "status": "SUCCEEDED", "defaultDatasetId": run_id} if run_id in self._runs else None
+        return _Resource(wait_for_finish=wait_for_finish)
+
+    def _items(self, run_input):
+        if run_input.get("searchType") == "hashtag":
+            sources = [(None, run_input["hashtag"])]
+        else:
+            sources = [(url, url.rstrip("/").rsplit("/", 1)[-1]) for url in run_input["directUrls"]]
+        for url, name in sources:
+            for i in range(self.posts_per_source):
+                posted = self.now - timedelta(seconds=(i * 86400 * self.days) // max(self.posts_per_source, 1))
+                item = {
+                    "url": f"https://www.instagram.com/reel/{name}-{i}/",
+                    "ownerUsername": name,
+                    "caption": f"Post {i} by {name} #lpu",
+                    "timestamp": posted.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    "likesCount": i * 11 % 900,
+                    "commentsCount": i * 3 % 60,
+                    "videoPlayCount": i * 101 % 20000
+                }
+                if url:
+                    item["inputUrl"] = url
+                yield item
+
+    def dataset(self, dataset_id):
+        def iterate_items():
+            self._call("dataset.iterate_items")
+            yield from self._items(self._runs[dataset_id])
+        return _Resource(iterate_items=iterate_items)
+
+
+# --- Google Sheets (gspread) ---
+
+def _split_range(name):
+    # "'Tab ''x'''!A1:C3" -> ("Tab 'x'", "A1:C3")
+    match = re.match(r"^'((?:[^']|'')*)'(?:!(.*))?$", name) or re.match(r"^([^!]*)(?:!(.*))?$", name)
+    return match.group(1).replace("''", "'"), match.group(2)
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, sheet_id, title, values=None, row_count=1000, col_count=26):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.values = [list(row) for row in values or []]
+        self.row_count = max(row_count, len(self.values))
+        self.col_count = max([col_count] + [len(row) for row in self.values])
+
+    # Formatted values are the cells as text; unformatted ones keep the
+    # numbers that were written
+    def get_all_values(self, value_render_option="FORMATTED_VALUE"):
+        self.spreadsheet._call("values.get")
+        width = max((len(row) for row in self.values), default=0)
+        render = str if value_render_option == "FORMATTED_VALUE" else (lambda v: v)
+        rows = [[render(v) for v in row] + [""] * (width - len(row)) for row in self.values]
+        while rows and not any(v != "" for v in rows[-1]):
+            rows.pop()
+        return rows
+
+    def row_values(self, row):
+        self.spreadsheet._call("values.get")
+        return [str(v) for v in self.values[row - 1]] if row <= len(self.values) else []
+
+    # Whole-column ranges such as "C2:C", as ingest.read_columns asks for
+    def batch_get(self, ranges):
+        self.spreadsheet._call("values.batchGet")
+        value_ranges = []
+        for name in ranges:
+            start, _ = name.split(":")
+            row, col = a1_to_rowcol(start)
+            rows = [[str(r[col - 1])] if col <= len(r) and r[col - 1] != "" else [] for r in self.values[row - 1:]]
+            while rows and not rows[-1]:
+                rows.pop()
+            value_ranges.append(rows)
+        return value_ranges
+
+
+class FakeSpreadsheet(_Fake):
+    def __init__(self, tabs=None, **kwargs):
+        super().__init__(**kwargs)
+        self._sheets = {}
+        for title, values in (tabs or {}).items():
+            self.add_tab(title, values)
+
+    def add_tab(self, title, values=None):
+        sheet_id = max([ws.id for ws in self._sheets.values()] + [0]) + 1
+        self._sheets[title] = FakeWorksheet(self, sheet_id, title, values)
+        return self._sheets[title]
+
+    def worksheets(self):
+        self._call("spreadsheets.get")
+        return list(self._sheets.values())
+
+    def worksheet(self, title):
+        self._call("spreadsheets.get")
+        return self._sheets[title]
+
+    def values_batch_get(self, ranges, params=None):
+        self._call("values.batchGet")
+        render = (params or {}).get("valueRenderOption", "FORMATTED_VALUE")
+        value_ranges = []
+        for name in ranges:
+            title, _ = _split_range(name)
+            rows = self._sheets[title].get_all_values(render)
+            value_ranges.append({"range": name, "values": rows} if rows else {"range": name})
+        return {"valueRanges": value_ranges}
+
+    def batch_update(self, body):
+        self._call("spreadsheets.batchUpdate")
+        by_id = {ws.id: ws for ws in self._sheets.values()}
+        for request in body["requests"]:
+            if "addSheet" in request:
+                properties = request["addSheet"]["properties"]
+                grid = properties.get("gridProperties", {})
+                ws = FakeWorksheet(self, properties["sheetId"], properties["title"],
+                                   row_count=grid.get("rowCount", 1000), col_count=grid.get("columnCount", 26))
+                self._sheets[ws.title] = by_id[ws.id] = ws
+            elif "deleteDimension" in request:
+                span = request["deleteDimension"]["range"]
+                ws = by_id[span["sheetId"]]
+                del ws.values[span["startIndex"]:span["endIndex"]]
+                ws.row_count -= span["endIndex"] - span["startIndex"]
+            elif "appendDimension" in request:
+                append = request["appendDimension"]
+                ws = by_id[append["sheetId"]]
+                if append["dimension"] == "ROWS":
+                    ws.row_count += append["length"]
+                else:
+                    ws.col_count += append["length"]
+        return {}
+
+    def values_batch_update(self, body):
+        self._call("values.batchUpdate")
+        for value_range in body["data"]:
+            title, a1 = _split_range(value_range["range"])
+            ws = self._sheets[title]
+            row, col = a1_to_rowcol(a1.split(":")[0])
+            for offset, values in enumerate(value_range["values"]):
+                index = row - 1 + offset
+                while len(ws.values) <= index:
+                    ws.values.append([])
+                target = ws.values[index]
+                target.extend([""] * (col - 1 + len(values) - len(target)))
+                target[col - 1:col - 1 + len(values)] = ["" if v is None else v for v in values]
+        return {}
@@ -0,0 +1,187 @@
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clients
+import concurrency
+import metrics
+import reporting
+from fakes import FakeApify, FakeSpreadsheet, FakeYouTube
+from ig_classification import ASSIGNMENT_TO_SHEET, run_ig_classification
+from ig_discovery import PLACEHOLDER_COLUMNS, REEL_COLUMNS, run_ig_discovery
+from yt_classification import run_yt_classification
+from yt_discovery import run_yt_discovery
+
+# Offline benchmark of the four pipelines against the fakes in fakes.py, e.g.
+#   python benchmarks/run_benchmarks.py --scales 100 10000 100000
+# Every stage runs on a fresh fake spreadsheet and a fresh local database,
+# so caches from one stage or run do not flatter the next. Reports wall
+# time, peak traced memory, the fake API calls made and the pipeline's own
+# stage timings (metrics.py) per stage.
+
+YT_TYPES = ["student", "influencer_commercial", "influencer_noncommercial", "creatorverse", ""]
+POSTS_PER_SOURCE = 50
+HASHTAG_COUNT = 8
+
+
+class CollectingSink:
+    def __init__(self):
+        self.messages = []
+        self.error = None
+
+    def report(self, level, message):
+        self.messages.append((level, message))
+        if level == "error" and self.error is None:
+            self.error = str(message)
+
+    def set_progress(self, fraction, text=None):
+        pass
+
+    def fail(self, reason):
+        self.error = str(reason)
+
+
+def discovered_videos(scale):
+    now = time.time()
+    header = ["Video URL", "Channel Name", "Video Title", "Publish Date", "Views", "Likes", "Comments",
+              "Assigned Type", "Remarks"]
+    rows = [[
+        f"https://www.youtube.com/watch?v=vid{n:08d}", f"Channel {n % 97}", f"Video {n}",
+        time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - n * 600)),
+        str(n * 37 % 100000), str(n * 13 % 5000), str(n * 7 % 400), YT_TYPES[n % len(YT_TYPES)], ""
+    ] for n in range(scale)]
+    return [header] + rows
+
+
+def discovered_reels(scale):
+    assignments = list(ASSIGNMENT_TO_SHEET) + ["", "unknown_type"]
+    header = REEL_COLUMNS + list(PLACEHOLDER_COLUMNS)
+    rows = []
+    for n in range(scale):
+        row = [f"https://www.instagram.com/reel/r{n}/", f"user{n % 300}", f"Caption {n}",
+               time.strftime("%Y-%m-%d", time.gmtime(time.time() - n * 600)),
+               str(n * 11 % 900), str(n * 3 % 60), str(n * 101 % 20000)]
+        extras = dict(PLACEHOLDER_COLUMNS, **{"Assigned Type": assignments[n % len(assignments)],
+                                             "Followers": str(n % 50000), "Number of Reels": str(n % 40)})
+        rows.append(row + list(extras.values()))
+    return [header] + rows
+
+
+def input_pages(scale):
+    profiles = max(1, math.ceil(scale / POSTS_PER_SOURCE) - HASHTAG_COUNT)
+    return [["Profile URL"]] + [[f"https://www.instagram.com/profile{n}/"] for n in range(profiles)]
+
+
+# name -> (fakes for the scale, pipeline call)
+def stages(scale, fake_options):
+    per_keyword = max(1, math.ceil(scale / 10))
+    return {
+        "yt_discovery": (
+            lambda: {"youtube": FakeYouTube(videos_per_keyword=per_keyword, overlap=0.0, **fake_options),
+                     "spreadsheet": FakeSpreadsheet(**fake_options)},
+            lambda: run_yt_discovery(days_back=30, requests_per_second=0, max_results_per_keyword=per_keyword,
+                                     incremental=False)
+        ),
+        "yt_classification": (
+            lambda: {"youtube": FakeYouTube(**fake_options),
+                     "spreadsheet": FakeSpreadsheet({"Discovered Videos": discovered_videos(scale)}, **fake_options)},
+            lambda: run_yt_classification(days_back=30)
+        ),
+        "ig_discovery": (
+            lambda: {"apify": FakeApify(posts_per_source=POSTS_PER_SOURCE, **fake_options),
+                     "spreadsheet": FakeSpreadsheet({"IG Input Pages": input_pages(scale)}, **fake_options)},
+            lambda: run_ig_discovery(days_back=30, incremental=False)
+        ),
+        "ig_classification": (
+            lambda: {"spreadsheet": FakeSpreadsheet({"Discovered IG Reels": discovered_reels(scale)}, **fake_options)},
+            lambda: run_ig_classification()
+        ),
+    }
+
+
+def run_stage(name, make_fakes, run, trace_memory):
+    fakes = make_fakes()
+    for kind, fake in fakes.items():
+        clients.set_client_override(kind, fake)
+    sink = CollectingSink()
+    token = reporting.use_sink(sink)
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        os.environ["LPU_LOCAL_DB"] = os.path.join(workdir, "bench.db")
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            with metrics.run(name, save=False) as run_metrics:
+                run()
+        finally:
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+            os.chdir(cwd)
+            reporting.reset_sink(token)
+            for kind in fakes:
+                clients.set_client_override(kind, None)
+    calls = {}
+    for fake in fakes.values():
+        calls.update(fake.calls)
+    summary = run_metrics.summary()
+    return {
+        "seconds": round(seconds, 3),
+        "quota_units": summary["quota_units"],
+        "stages": summary["stages"],
+        "peak_mb": round(peak / 2**20, 1) if peak is not None else None,
+        "calls": dict(sorted(calls.items())),
+        "status": "failed" if sink.error else "ok",
+        "error": sink.error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines against offline fakes.")
+    parser.add_argument("--scales", nargs="+", type=int, default=[100, 10000, 100000])
+    parser.add_argument("--stages", nargs="+", default=["yt_discovery", "yt_classification", "ig_discovery", "ig_classification"])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per fake API call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability a fake API call fails")
+    parser.add_argument("--retry-base", type=float, default=0.05,
+                        help="base backoff in seconds for retried fake failures (the pipelines use 1s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peak memory)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    concurrency.RETRY_BASE_SECONDS = args.retry_base
+    fake_options = {"latency": args.latency, "failure_rate": args.failure_rate, "seed": args.seed}
+    results = []
+    print(f"{'scale':>8}  {'stage':<18} {'seconds':>8} {'peak MB':>8}  status  calls")
+    for scale in args.scales:
+        for name, (make_fakes, run) in stages(scale, fake_options).items():
+            if name not in args.stages:
+                continue
+            result = {"scale": scale, "stage": name, **run_stage(name, make_fakes, run, not args.no_memory)}
+            results.append(result)
+            calls = ", ".join(f"{method}={count}" for method, count in result["calls"].items())
+            peak = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+            print(f"{scale:>8}  {name:<18} {result['seconds']:>8.2f} {peak:>8}  {result['status']:<6}  {calls}")
+            print(f"{'':>10}" + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages"].items())
+                  + f" | quota {result['quota_units']}")
+            if result["error"]:
+                print(f"{'':>10}{result['error']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
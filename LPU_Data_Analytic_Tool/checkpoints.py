@@ -0,0 +1,90 @@
+import json
+import threading
+from datetime import datetime
+from local_store import get_connection, ensure_schema
+
+# Progress of the last run of each discovery pipeline, so a run that fails
+# partway can be resumed without fetching its finished units again. A unit
+# is one piece of fetched work (a keyword search, an actor run's dataset)
+# stored as JSON. Starting a run without resume discards the previous
+# checkpoint; a run that completes deletes its own.
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS checkpoint_runs (
+        pipeline TEXT PRIMARY KEY,
+        params TEXT NOT NULL,
+        started_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS checkpoint_units (
+        pipeline TEXT NOT NULL,
+        unit TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        saved_at TEXT NOT NULL,
+        PRIMARY KEY (pipeline, unit)
+    ) WITHOUT ROWID
+    """
+)
+
+
+def _connection():
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    return conn
+
+
+def _now():
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+# Start time (naive UTC) and unit count of the pipeline's unfinished run, or None
+def pending(pipeline):
+    conn = _connection()
+    row = conn.execute("SELECT started_at FROM checkpoint_runs WHERE pipeline = ?", (pipeline,)).fetchone()
+    if row is None:
+        return None
+    units = conn.execute("SELECT COUNT(*) FROM checkpoint_units WHERE pipeline = ?", (pipeline,)).fetchone()[0]
+    return datetime.fromisoformat(row[0]), units
+
+
+class Checkpoint:
+    # With resume=True and an unfinished run on record, that run's params
+    # and units are loaded (resumed is True) and the caller must use
+    # .params instead of its own; otherwise a new run is recorded.
+    def __init__(self, pipeline, params, resume=False):
+        self.pipeline = pipeline
+        self._lock = threading.Lock()
+        conn = _connection()
+        row = conn.execute("SELECT params, started_at FROM checkpoint_runs WHERE pipeline = ?", (pipeline,)).fetchone()
+        self.resumed = bool(resume and row)
+        if self.resumed:
+            self.params, self.started_at = json.loads(row[0]), datetime.fromisoformat(row[1])
+            self.units = {unit: json.loads(payload) for unit, payload in conn.execute(
+                "SELECT unit, payload FROM checkpoint_units WHERE pipeline = ?", (pipeline,))}
+            return
+        self.params, self.started_at, self.units = params, datetime.utcnow(), {}
+        with conn:
+            conn.execute("DELETE FROM checkpoint_units WHERE pipeline = ?", (pipeline,))
+            conn.execute("INSERT OR REPLACE INTO checkpoint_runs (pipeline, params, started_at) VALUES (?, ?, ?)",
+                         (pipeline, json.dumps(params), self.started_at.isoformat(timespec="seconds")))
+
+    def get(self, unit):
+        with self._lock:
+            return self.units.get(unit)
+
+    def save(self, unit, payload):
+        with self._lock:
+            self.units[unit] = payload
+        conn = get_connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO checkpoint_units (pipeline, unit, payload, saved_at) VALUES (?, ?, ?, ?)",
+                         (self.pipeline, unit, json.dumps(payload), _now()))
+
+    # The run's results are safely stored elsewhere; nothing left to resume
+    def finish(self):
+        conn = _connection()
+        with conn:
+            conn.execute("DELETE FROM checkpoint_units WHERE pipeline = ?", (self.pipeline,))
+            conn.execute("DELETE FROM checkpoint_runs WHERE pipeline = ?", (self.pipeline,))
@@ -0,0 +1,102 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import jobs
+from pipelines import PIPELINES, PLATFORMS, pipeline_function, pipeline_params
+
+# Headless entry point for scheduled runs, e.g.
+#   python cli.py --days-back 1 --parallel --daily-at 02:00
+# Secrets come from the environment or a secrets.toml (see config.py),
+# progress goes to the log. Each run is recorded in job_history like a run
+# started from the app, so the app's "Last ..." bars include it.
+
+logger = logging.getLogger("lpu.cli")
+
+
+# Discovery then classification for one platform; stops at the first step
+# that fails so nothing is classified from a half-written discovery.
+def run_platform(platform, tasks, days_back, incremental, source="sheet", resume=False):
+    for name in PLATFORMS[platform]:
+        if name.split("_", 1)[1] not in tasks:
+            continue
+        label = PIPELINES[name][0]
+        params = pipeline_params(name, days_back, incremental, source, resume)
+        try:
+            job, started = jobs.submit(name, pipeline_function(name), **params)
+            # One run per pipeline at a time: queue behind a run with other settings
+            while not started and job.params != params:
+                logger.info("%s already running with other settings, waiting to start after it", label)
+                job.wait()
+                job, started = jobs.submit(name, pipeline_function(name), **params)
+        except jobs.PipelineBusy as e:
+            # Another process (the app or another cli.py) runs it; not started
+            logger.warning("%s not started: %s", label, e)
+            return False
+        if not started:
+            logger.info("%s already running, waiting for it", label)
+        job.wait()
+        if job.status != jobs.SUCCEEDED:
+            logger.warning("%s %s", label, job.status)
+            return False
+        logger.info("%s %s", label, job.status)
+    return True
+
+
+def run_once(args):
+    def run(platform):
+        return run_platform(platform, args.tasks, args.days_back, not args.full,
+                            "archive" if args.from_archive else "sheet", args.resume)
+
+    if args.parallel and len(args.platforms) > 1:
+        with ThreadPoolExecutor(max_workers=len(args.platforms)) as pool:
+            return all(pool.map(run, args.platforms))
+    return all([run(platform) for platform in args.platforms])
+
+
+def next_run_at(now, daily_at=None, every_minutes=None):
+    if every_minutes:
+        return now + timedelta(minutes=every_minutes)
+    hour, minute = map(int, daily_at.split(":"))
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run LPU discovery and classification pipelines without the app.")
+    parser.add_argument("--days-back", type=int, default=1, help="discovery window in days (default 1)")
+    parser.add_argument("--platforms", nargs="+", choices=sorted(PLATFORMS), default=["youtube", "instagram"])
+    parser.add_argument("--tasks", nargs="+", choices=["discovery", "classification"],
+                        default=["discovery", "classification"])
+    parser.add_argument("--parallel", action="store_true", help="run the platforms side by side")
+    parser.add_argument("--full", action="store_true", help="rescan the whole window instead of only new content")
+    parser.add_argument("--from-archive", action="store_true",
+                        help="classify the --days-back window from the local archive instead of the whole sheet")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last unfinished discovery run from its checkpoint")
+    schedule = parser.add_mutually_exclusive_group()
+    schedule.add_argument("--daily-at", metavar="HH:MM", help="keep running, once a day at this local time")
+    schedule.add_argument("--every", type=float, metavar="MINUTES", help="keep running, every MINUTES")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.daily_at and not args.every:
+        return 0 if run_once(args) else 1
+
+    if args.every and not run_once(args):
+        logger.warning("Run finished with failures")
+    while True:
+        run_at = next_run_at(datetime.now(), args.daily_at, args.every)
+        logger.info("Next run at %s", run_at.strftime("%Y-%m-%d %H:%M"))
+        time.sleep(max((run_at - datetime.now()).total_seconds(), 0))
+        if not run_once(args):
+            logger.warning("Run finished with failures")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+import json
+import re
+import threading
+from functools import lru_cache
+import gspread
+from google.oauth2.service_account import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from apify_client import ApifyClient
+from config import get_secret
+
+# Process-wide API clients. Streamlit re-executes the page script on every
+# interaction but keeps imported modules, so everything cached here is
+# created once per process: credentials are parsed once, HTTP sessions stay
+# keep-alive and access tokens are only refreshed when they expire.
+# Caches are keyed by the secret values, so rotated secrets get new clients.
+
+SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+_local = threading.local()
+
+# Stand-in clients (e.g. the fakes in benchmarks/) by kind: "gsheet",
+# "spreadsheet", "youtube", "apify". An override wins over the real client.
+_overrides = {}
+
+
+def set_client_override(kind, client):
+    if client is None:
+        _overrides.pop(kind, None)
+    else:
+        _overrides[kind] = client
+
+
+@lru_cache(maxsize=None)
+def _gsheet_client(service_account_json):
+    # IMPORTANT: SERVICE_ACCOUNT_JSON must have escaped newlines (\n), not actual line breaks!
+    info = json.loads(service_account_json)
+    creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+    return gspread.authorize(creds)
+
+
+@lru_cache(maxsize=None)
+def _spreadsheet(service_account_json, sheet_name):
+    return _gsheet_client(service_account_json).open(sheet_name)
+
+
+@lru_cache(maxsize=None)
+def _apify_client(token):
+    return ApifyClient(token)
+
+
+def get_gsheet_client():
+    if "gsheet" in _overrides:
+        return _overrides["gsheet"]
+    return _gsheet_client(get_secret("SERVICE_ACCOUNT_JSON"))
+
+
+# Opening by name is a Drive lookup; the handle is reused afterwards.
+def get_spreadsheet(sheet_name=None):
+    if "spreadsheet" in _overrides:
+        return _overrides["spreadsheet"]
+    return _spreadsheet(get_secret("SERVICE_ACCOUNT_JSON"), sheet_name or get_secret("GOOGLE_SHEET_NAME"))
+
+
+# Resources the pipelines call; the rest of the API is left out of the
+# discovery document so services build and attach fewer methods.
+YOUTUBE_RESOURCES = ("search", "videos")
+
+
+# The YouTube v3 discovery document bundled with googleapiclient, cut down to
+# YOUTUBE_RESOURCES and the schemas they reference. Read once per process and
+# never fetched over the network. Kept as text: build_from_document changes
+# the parsed document, so every service gets its own copy.
+@lru_cache(maxsize=None)
+def _youtube_document():
+    document = json.loads(discovery_cache.get_static_doc("youtube", "v3"))
+    document["resources"] = {name: document["resources"][name] for name in YOUTUBE_RESOURCES}
+    schemas, pending = {}, [json.dumps(document["resources"])]
+    while pending:
+        for name in re.findall(r'"\$ref": "(\w+)"', pending.pop()):
+            if name not in schemas:
+                schemas[name] = document["schemas"][name]
+                pending.append(json.dumps(schemas[name]))
+    document["schemas"] = schemas
+    return json.dumps(document)
+
+
+# googleapiclient services wrap a single httplib2 connection and are not
+# thread-safe, so each thread keeps its own service per API key.
+def get_youtube():
+    if "youtube" in _overrides:
+        return _overrides["youtube"]
+    api_key = get_secret("YOUTUBE_API_KEY")
+    services = getattr(_local, "youtube", None)
+    if services is None:
+        services = _local.youtube = {}
+    if api_key not in services:
+        services[api_key] = build_from_document(_youtube_document(), developerKey=api_key)
+    return services[api_key]
+
+
+def get_apify_client():
+    if "apify" in _overrides:
+        return _overrides["apify"]
+    return _apify_client(get_secret("APIFY_TOKEN"))
@@ -0,0 +1,117 @@
+import calendar
+import pandas as pd
+from ingest import date_text, parse_dates
+
+# Declarative output layouts. A layout is a list of (output column, spec);
+# compile_layout turns it once into a builder that fills every column of an
+# output sheet from a whole DataFrame slice at a time.
+#
+#   source("Reel URL")                        copy an input column ("" if absent)
+#   const("Instagram")                        same value on every row
+#   serial()                                  1..n within the sheet
+#   derived("month", "Date")                  named expression over input columns
+#   derived("engagement", "Likes", "Comments", "Shares")
+
+
+def source(column):
+    return ("source", column)
+
+
+def const(value):
+    return ("const", value)
+
+
+def serial():
+    return ("serial",)
+
+
+def derived(name, *columns):
+    return ("derived", name, columns)
+
+
+def _raw(df, column):
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column]
+
+
+# Typed dates are written back as typed, or as ISO dates (the format IG
+# discovery writes) where there is no cell text
+def _column(df, column):
+    values = _raw(df, column)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return date_text(df, column, "%Y-%m-%d")
+    return values
+
+
+def _month(df, column):
+    dates = parse_dates(_raw(df, column))
+    names = dates.dt.month.map(dict(enumerate(calendar.month_name)))
+    return (names + "-" + dates.dt.year.astype("Int64").astype(str)).where(dates.notna(), "")
+
+
+def _digit_count(values):
+    if pd.api.types.is_integer_dtype(values):
+        return values.fillna(0).astype("int64")
+    text = values.astype(str)
+    return pd.to_numeric(text.where(text.str.isdigit(), "0")).astype("int64")
+
+
+def _engagement(df, *columns):
+    total = pd.Series(0, index=df.index, dtype="int64")
+    for column in columns:
+        total = total + _digit_count(_raw(df, column))
+    return total
+
+
+DERIVED_FUNCTIONS = {
+    "month": _month,
+    "engagement": _engagement
+}
+
+
+def _compile_spec(spec):
+    kind = spec[0]
+    if kind == "source":
+        return lambda df: _column(df, spec[1])
+    if kind == "const":
+        return lambda df: spec[1]
+    if kind == "serial":
+        return lambda df: pd.RangeIndex(1, len(df) + 1)
+    if kind == "derived":
+        function = DERIVED_FUNCTIONS[spec[1]]
+        return lambda df: function(df, *spec[2])
+    raise ValueError(f"Unknown column spec: {spec!r}")
+
+
+def compile_layout(layout):
+    columns = [column for column, _ in layout]
+    builders = [_compile_spec(spec) for _, spec in layout]
+
+    def build(df):
+        df = df.reset_index(drop=True)
+        values = {}
+        for column, builder in zip(columns, builders):
+            value = builder(df)
+            values[column] = value.values if hasattr(value, "values") else value
+        return pd.DataFrame(values, index=df.index, columns=columns)
+
+    build.columns = columns
+    return build
+
+
+# Output column filled from `source_column` (first one if several), used as
+# the row key when a sheet is updated in place.
+def key_column(layout, source_column):
+    return next(column for column, spec in layout if spec == source(source_column))
+
+
+# Output column numbered by serial(), or None
+def serial_column(layout):
+    return next((column for column, spec in layout if spec == serial()), None)
+
+
+# Output columns whose source column is not among `columns`: the pipeline
+# leaves them blank, so whatever is in them was typed on the output tab.
+def unsourced_columns(layout, columns):
+    return [column for column, spec in layout if spec[0] == "source" and spec[1] not in columns]
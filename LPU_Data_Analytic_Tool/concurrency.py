@@ -0,0 +1,75 @@
+import contextvars
+import random
+import threading
+import time
+import reporting
+
+
+# Token-spacing limiter shared by worker threads: at most `requests_per_second`
+# calls to wait() return per second across the whole pool.
+class RateLimiter:
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second and requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+# pool.submit that runs `fn` in a copy of the caller's context, so context
+# variables (the reporting sink, the metrics run) reach the worker thread.
+def submit_in_context(pool, fn, *args, **kwargs):
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# --- Retries ---
+# Exponential backoff with full jitter: the n-th retry waits a random time
+# up to min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**n), so workers that
+# failed together do not retry together.
+RETRY_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 32.0
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _status(error):
+    # googleapiclient HttpError, Apify / gspread API errors and the benchmark fakes
+    for status in (getattr(getattr(error, "resp", None), "status", None), getattr(error, "status_code", None),
+                   getattr(getattr(error, "response", None), "status_code", None)):
+        if status is not None:
+            return int(status)
+    return None
+
+
+# Rate limits, server errors and timeouts. YouTube answers both per-minute
+# rate limits and the exhausted daily quota with 403; only the former passes.
+def is_retryable(error):
+    if isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in type(error).__name__:
+        return True
+    status = _status(error)
+    if status == 403:
+        return "ratelimitexceeded" in str(getattr(error, "content", error)).lower()
+    return status in RETRYABLE_STATUS
+
+
+def retry(func, *args, attempts=None, **kwargs):
+    attempts = attempts or RETRY_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+            reporting.info(f"↻ {e} — retry {attempt + 1}/{attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
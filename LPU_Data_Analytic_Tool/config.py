@@ -0,0 +1,40 @@
+import os
+import sys
+import tomllib
+from functools import lru_cache
+
+# Secrets provider, so the pipelines run with or without a Streamlit session.
+# A secret is looked up, in order, in:
+#   1. the environment (same names as in secrets.toml)
+#   2. the TOML file named by LPU_SECRETS_FILE, then .streamlit/secrets.toml
+#      in the working directory and in the home directory
+#   3. st.secrets, when running inside Streamlit
+
+SECRETS_FILE_ENV = "LPU_SECRETS_FILE"
+
+
+def _secrets_files():
+    paths = [os.environ.get(SECRETS_FILE_ENV), os.path.join(".streamlit", "secrets.toml"),
+             os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml")]
+    return [path for path in paths if path and os.path.isfile(path)]
+
+
+# Keyed by modification time, so an edited file is read again
+@lru_cache(maxsize=None)
+def _load_file(path, mtime):
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def get_secret(name):
+    if name in os.environ:
+        return os.environ[name]
+    for path in _secrets_files():
+        values = _load_file(path, os.path.getmtime(path))
+        if name in values:
+            return values[name]
+    if "streamlit" in sys.modules:
+        import streamlit as st
+        if name in st.secrets:
+            return st.secrets[name]
+    raise KeyError(f"Secret '{name}' not found in the environment, {SECRETS_FILE_ENV} or .streamlit/secrets.toml")
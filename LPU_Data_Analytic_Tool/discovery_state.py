@@ -0,0 +1,102 @@
+from datetime import datetime
+from local_store import get_connection, ensure_schema
+
+# What the discovery pipelines already found, so a run only has to look at
+# content published since the previous one:
+#   - discovery_watermarks: newest publish time seen per (platform, source),
+#     a source being a YT keyword, an IG profile URL or an IG #hashtag
+#   - seen_content: every video / reel already written to a discovered tab
+# Times are naive UTC, stored as ISO text so they sort as strings.
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS discovery_watermarks (
+        platform TEXT NOT NULL,
+        source TEXT NOT NULL,
+        published_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (platform, source)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS seen_content (
+        platform TEXT NOT NULL,
+        content_id TEXT NOT NULL,
+        source TEXT,
+        published_at TEXT,
+        first_seen TEXT NOT NULL,
+        PRIMARY KEY (platform, content_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS seen_content_published ON seen_content (platform, published_at)"
+)
+
+ADVANCE = (
+    "INSERT INTO discovery_watermarks (platform, source, published_at, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(platform, source) DO UPDATE SET "
+    "published_at = max(published_at, excluded.published_at), updated_at = excluded.updated_at"
+)
+
+MARK_SEEN = (
+    "INSERT OR IGNORE INTO seen_content (platform, content_id, source, published_at, first_seen) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def _connection():
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    return conn
+
+
+def _text(dt):
+    return dt.replace(tzinfo=None).isoformat(timespec="seconds") if dt is not None else None
+
+
+# {source: newest publish time} for the sources that have a watermark
+def get_watermarks(platform, sources):
+    sources = list(sources)
+    watermarks = {}
+    for i in range(0, len(sources), 500):
+        chunk = sources[i:i+500]
+        rows = _connection().execute(
+            f"SELECT source, published_at FROM discovery_watermarks "
+            f"WHERE platform = ? AND source IN ({', '.join('?' * len(chunk))})",
+            [platform, *chunk]
+        )
+        for source, published_at in rows:
+            watermarks[source] = datetime.fromisoformat(published_at)
+    return watermarks
+
+
+# Watermarks only move forward; {source: publish time}
+def advance_watermarks(platform, published):
+    now = _text(datetime.utcnow())
+    conn = _connection()
+    with conn:
+        conn.executemany(ADVANCE, [
+            (platform, source, _text(published_at), now)
+            for source, published_at in published.items() if published_at is not None
+        ])
+
+
+# IDs of content published since `since` that was already discovered. The
+# discovery window bounds the set, so it stays small however long the
+# history gets.
+def seen_since(platform, since):
+    rows = _connection().execute(
+        "SELECT content_id FROM seen_content WHERE platform = ? AND published_at >= ?",
+        (platform, _text(since))
+    )
+    return {content_id for content_id, in rows}
+
+
+# records: (content id, source, publish time)
+def mark_seen(platform, records):
+    now = _text(datetime.utcnow())
+    conn = _connection()
+    with conn:
+        conn.executemany(MARK_SEEN, [
+            (platform, content_id, source, _text(published_at), now)
+            for content_id, source, published_at in records
+        ])
@@ -1,312 +1,208 @@
-import pandas as pd
-import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
+import analytics
+import archive
+import metrics
+import reporting
+from clients import get_spreadsheet
+from column_mapping import compile_layout, const, derived, key_column, serial, serial_column, source, unsourced_columns
+from ingest import CATEGORY, COUNT, DATETIME, coerce_frame, read_columns, read_header, read_worksheet, summarize_report
+from sheet_writer import SheetBatch
 
-def get_gsheet_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    info = json.loads(st.secrets["SERVICE_ACCOUNT_JSON"])  
-    creds = Credentials.from_service_account_info(info, scopes=scope)
-    return gspread.authorize(creds)
+# --- Output sheet layouts (ALL SHEETS) ---
+# Each campaign tab lists its columns as column_mapping specs; adding a tab
+# only needs a layout here and its assignment type in ASSIGNMENT_TO_SHEET.
+MONTH = derived("month", "Date")
+ENGAGEMENT = derived("engagement", "Likes", "Comments", "Shares")
+INSTAGRAM = const("Instagram")
 
-def run_ig_classification():
+SHEET_LAYOUTS = {
+    "Influencer Reel with Commercials": [
+        ("S.No", serial()), ("Month", MONTH), ("Influencer Name", source("Username")), ("Theme", source("Theme")),
+        ("Instagram Reel", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Shares", source("Shares")), ("Total Engagement", ENGAGEMENT),
+        ("Commercials", source("Commercials")), ("Platform", INSTAGRAM)
+    ],
+    "Influencer Reel without Commercials": [
+        ("S.No", serial()), ("Month", MONTH), ("Influencer Name", source("Username")), ("ID", source("ID")),
+        ("Instagram Reel", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Shares", source("Shares")), ("Total Engagement", ENGAGEMENT),
+        ("Platform", INSTAGRAM)
+    ],
+    "Chancellor Sir PR": [
+        ("S.No", serial()), ("Month", MONTH), ("Channel name", source("Username")), ("Followers", source("Followers")),
+        ("Live Reel Link", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("share", source("Shares")), ("Amount to Be Paid (INR)", source("Amount")),
+        ("Date Posted", source("Date")), ("Payment Status", source("Payment Status")), ("Platform", INSTAGRAM)
+    ],
+    "Campus Reel": [
+        ("S.No", serial()), ("Month", MONTH), ("Account Name", source("Username")), ("ID", source("ID")),
+        ("Link", source("Reel URL")), ("views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Shares", source("Shares")), ("Platform", INSTAGRAM)
+    ],
+    "Meme Marketing": [
+        ("S.No", serial()), ("Month", MONTH), ("Page Name", source("Username")), ("link", source("Reel URL")),
+        ("Live Reel Link", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Shares", source("Shares")), ("followers", source("Followers")),
+        ("Platform", INSTAGRAM)
+    ],
+    "Student Profiles": [
+        ("Sr.No", serial()), ("Name", source("Username")), ("Platform", INSTAGRAM),
+        ("Profile/Channel Link", source("Reel URL")), ("Followers", source("Followers")),
+        ("Number of Reels", source("Number of Reels")), ("Account Status", source("Account Status"))
+    ],
+    "LPU Confess": [
+        ("S.No", serial()), ("Link", source("Reel URL")), ("Amount", source("Amount")), ("Status", source("Status")),
+        ("Platform", INSTAGRAM)
+    ],
+    "Long Term Promotion": [
+        ("Sr.No", serial()), ("Name", source("Username")), ("Platform", INSTAGRAM),
+        ("Profile/Channel Link", source("Reel URL")), ("Followers", source("Followers")),
+        ("Number of Reels", source("Number of Reels")), ("Commercials Per Reel", source("Commercials Per Reel"))
+    ],
+    "Shoutout": [
+        ("S No.", serial()), ("Month", MONTH), ("ShortCode", source("ShortCode")), ("ID", source("ID")),
+        ("Video Link", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Shares", source("Shares")), ("Platform", INSTAGRAM)
+    ],
+    "InstaConfluence": [
+        ("S.No", serial()), ("Month", MONTH), ("Name", source("Username")), ("Platform", INSTAGRAM),
+        ("Link", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Share", source("Shares")), ("Followers", source("Followers"))
+    ],
+    "Diwali Competition": [
+        ("Timestamp", source("Date")), ("Month", MONTH), ("Email Address", source("Email Address")),
+        ("Name", source("Username")), ("Registration Number", source("Registration Number")),
+        ("Mobile Number", source("Mobile Number")), ("Type of Content", source("Type of Content")),
+        ("Link", source("Reel URL")), ("From where you come to know", source("From where you come to know")),
+        ("shortcode", source("ShortCode")), ("ID", source("ID")), ("Plays", source("Views")),
+        ("Likes", source("Likes")), ("Comments", source("Comments")), ("Shares", source("Shares")),
+        ("Points", source("Points")), ("Platform", INSTAGRAM)
+    ],
+    "Olympics": [
+        ("S.No", serial()), ("Month", MONTH), ("Influencer's Name", source("Username")), ("Platform", INSTAGRAM),
+        ("Link", source("Reel URL")), ("Views", source("Views")), ("Likes", source("Likes")),
+        ("Comments", source("Comments")), ("Share", source("Shares")), ("Type of Influencer", source("Type of Influencer")),
+        ("Shortcode", source("ShortCode")), ("id", source("ID"))
+    ],
+    "Digital Star": [
+        ("Timestamp", source("Date")), ("Month", MONTH), ("Email Address", source("Email Address")),
+        ("Name", source("Username")), ("Registration Number", source("Registration Number")),
+        ("Mobile Number", source("Mobile Number")), ("Themes", source("Theme")),
+        ("Type of Content", source("Type of Content")), ("Link (Reel or Post on Instagram)", source("Reel URL")),
+        ("shortcode", source("ShortCode")), ("ID", source("ID")), ("Plays", source("Views")),
+        ("Likes", source("Likes")), ("Comments", source("Comments")), ("Shares", source("Shares")),
+        ("Platform", INSTAGRAM)
+    ],
+    "Outcampus": [
+        ("S.No", serial()), ("Month", MONTH), ("Link", source("Reel URL")), ("shortcode", source("ShortCode")),
+        ("ID", source("ID")), ("Views", source("Views")), ("Likes", source("Likes")), ("Comment", source("Comments")),
+        ("Share", source("Shares")), ("Platform", INSTAGRAM)
+    ]
+}
+ASSIGNMENT_TO_SHEET = {
+    "influencer_commercial": "Influencer Reel with Commercials",
+    "influencer_noncommercial": "Influencer Reel without Commercials",
+    "chancellor_pr": "Chancellor Sir PR",
+    "meme_marketing": "Meme Marketing",
+    "campus_reel": "Campus Reel",
+    "student_profile": "Student Profiles",
+    "lpu_confess": "LPU Confess",
+    "long_term_promotion": "Long Term Promotion",
+    "shoutout": "Shoutout",
+    "instaconfluence": "InstaConfluence",
+    "diwali_competition": "Diwali Competition",
+    "olympics": "Olympics",
+    "digital_star": "Digital Star",
+    "outcampus": "Outcampus"
+}
+COMPILED_LAYOUTS = {sheet: compile_layout(layout) for sheet, layout in SHEET_LAYOUTS.items()}
+OUTPUT_KEYS = {sheet: key_column(layout, "Reel URL") for sheet, layout in SHEET_LAYOUTS.items()}
+OUTPUT_SERIALS = {sheet: serial_column(layout) for sheet, layout in SHEET_LAYOUTS.items()}
+
+DISCOVERED_REELS_SCHEMA = {
+    "Date": DATETIME,
+    "Views": COUNT,
+    "Likes": COUNT,
+    "Comments": COUNT,
+    "Shares": COUNT
+}
+
+# Groups reels by normalized assignment type in a single hash pass.
+# Returns {sheet: row positions} and {unrecognised assignment: row count}.
+def partition_by_assignment(assignments):
+    normalized = assignments.astype(str).str.strip().str.lower()
+    positions, unknown = {}, {}
+    for value, rows in normalized.groupby(normalized, sort=False).indices.items():
+        sheet = ASSIGNMENT_TO_SHEET.get(value)
+        if sheet:
+            positions[sheet] = rows
+        elif value not in ("", "nan", "none"):
+            unknown[value] = len(rows)
+    return positions, unknown
+
+# source="archive" takes the scraped columns of reels posted in the last
+# days_back days from the local archive and downloads only the analyst
+# columns (everything the archive does not hold) from the sheet. The output
+# tabs then keep the rows of reels outside that window.
+def run_ig_classification(source: str = "sheet", days_back: int = None):
     log = []
     try:
-        log.append("🏷️ Running IG Classification/Segregation...")
-        client = get_gsheet_client()
-        sheet_name = st.secrets["GOOGLE_SHEET_NAME"]
-        sh = client.open(sheet_name)
-        df = pd.DataFrame(sh.worksheet("Discovered IG Reels").get_all_records())
+        log.append(f"🏷️ Running IG Classification/Segregation (from the {source})...")
+        sh = get_spreadsheet()
+        if source == "archive":
+            with metrics.stage("archive read"):
+                df = archive.read("instagram", days_back)
+            window = f" from the last {days_back} days" if days_back else ""
+            if df.empty:
+                log.append(f"⚠️ The archive has no reels{window} — nothing to classify")
+                return
+            log.append(f"🗄️ {len(df)} archived reels{window}")
+        with metrics.stage("sheet read"):
+            ws = metrics.call("sheets", "worksheet", sh.worksheet, "Discovered IG Reels", measure=False)
+            if source == "archive":
+                header = read_header(ws)
+                analyst = [column for column in header if column not in df.columns]
+                df = archive.join_sheet_columns(df, read_columns(ws, ["Reel URL", *analyst], header), "Reel URL")
+            else:
+                df, _ = read_worksheet(ws)
         assignment_col = None
         for col in df.columns:
             if col.strip().lower() in ["assignment type", "assigned type"]:
                 assignment_col = col
                 break
         if assignment_col is None:
-            st.error("No 'Assignment type' or 'Assigned Type' column found in your sheet!")
+            reporting.error("No 'Assignment type' or 'Assigned Type' column found in your sheet!")
             return
+        with metrics.stage("classify"):
+            df, report = coerce_frame(df, {**DISCOVERED_REELS_SCHEMA, assignment_col: CATEGORY}, keep_text=["Date"])
+            positions, unknown = partition_by_assignment(df[assignment_col])
+        log.extend(summarize_report(report))
+        for value, count in unknown.items():
+            log.append(f"⚠️ Unknown assignment type '{value}' on {count} reel(s) — skipped")
 
-        # --- STEP 4: Define Output Column Structures and Mapping (ALL SHEETS) ---
-        sheet_columns = {
-            "Influencer Reel with Commercials": [
-                "S.No", "Month", "Influencer Name", "Theme", "Instagram Reel",
-                "Views", "Likes", "Comments", "Shares", "Total Engagement", "Commercials", "Platform"
-            ],
-            "Influencer Reel without Commercials": [
-                "S.No", "Month", "Influencer Name", "ID", "Instagram Reel",
-                "Views", "Likes", "Comments", "Shares", "Total Engagement", "Platform"
-            ],
-            "Chancellor Sir PR": [
-                "S.No", "Month", "Channel name", "Followers", "Live Reel Link", "Views", "Likes", "Comments",
-                "share", "Amount to Be Paid (INR)", "Date Posted", "Payment Status", "Platform"
-            ],
-            "Campus Reel": [
-                "S.No", "Month", "Account Name", "ID", "Link", "views", "Likes", "Comments", "Shares", "Platform"
-            ],
-            "Meme Marketing": [
-                "S.No", "Month", "Page Name", "link", "Live Reel Link", "Views", "Likes", "Comments", "Shares", "followers", "Platform"
-            ],
-            "Student Profiles": [
-                "Sr.No", "Name", "Platform", "Profile/Channel Link", "Followers", "Number of Reels", "Account Status"
-            ],
-            "LPU Confess": [
-                "S.No", "Link", "Amount", "Status", "Platform"
-            ],
-            "Long Term Promotion": [
-                "Sr.No", "Name", "Platform", "Profile/Channel Link", "Followers", "Number of Reels", "Commercials Per Reel"
-            ],
-            "Shoutout": [
-                "S No.", "Month", "ShortCode", "ID", "Video Link", "Views", "Likes", "Comments", "Shares", "Platform"
-            ],
-            "InstaConfluence": [
-                "S.No", "Month", "Name", "Platform", "Link", "Views", "Likes", "Comments", "Share", "Followers"
-            ],
-            "Diwali Competition": [
-                "Timestamp", "Month", "Email Address", "Name", "Registration Number", "Mobile Number", "Type of Content", "Link", "From where you come to know", "shortcode", "ID", "Plays", "Likes", "Comments", "Shares", "Points", "Platform"
-            ],
-            "Olympics": [
-                "S.No", "Month", "Influencer's Name", "Platform", "Link", "Views", "Likes", "Comments", "Share", "Type of Influencer", "Shortcode", "id"
-            ],
-            "Digital Star": [
-                "Timestamp", "Month", "Email Address", "Name", "Registration Number", "Mobile Number", "Themes", "Type of Content", "Link (Reel or Post on Instagram)", "shortcode", "ID", "Plays", "Likes", "Comments", "Shares", "Platform"
-            ],
-            "Outcampus": [
-                "S.No", "Month", "Link", "shortcode", "ID", "Views", "Likes", "Comment", "Share", "Platform"
-            ]
-        }
-        assignment_to_sheet_map = {
-            "influencer_commercial": "Influencer Reel with Commercials",
-            "influencer_noncommercial": "Influencer Reel without Commercials",
-            "chancellor_pr": "Chancellor Sir PR",
-            "meme_marketing": "Meme Marketing",
-            "campus_reel": "Campus Reel",
-            "student_profile": "Student Profiles",
-            "lpu_confess": "LPU Confess",
-            "long_term_promotion": "Long Term Promotion",
-            "shoutout": "Shoutout",
-            "instaconfluence": "InstaConfluence",
-            "diwali_competition": "Diwali Competition",
-            "olympics": "Olympics",
-            "digital_star": "Digital Star",
-            "outcampus": "Outcampus"
-        }
-        df["Assigned Sheet"] = df[assignment_col].apply(lambda x: assignment_to_sheet_map.get(str(x).strip().lower(), None))
-
-        def fill_output_row(sheet, row, idx):
-            out = dict()
-            # 1. Influencer Reel with Commercials
-            if sheet == "Influencer Reel with Commercials":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Influencer Name"] = row.get("Username", "")
-                out["Theme"] = row.get("Theme", "")
-                out["Instagram Reel"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                try:
-                    likes = int(row.get("Likes",0)) if str(row.get("Likes",0)).isdigit() else 0
-                    comments = int(row.get("Comments",0)) if str(row.get("Comments",0)).isdigit() else 0
-                    shares = int(row.get("Shares",0)) if str(row.get("Shares",0)).isdigit() else 0
-                    out["Total Engagement"] = likes + comments + shares
-                except:
-                    out["Total Engagement"] = ""
-                out["Commercials"] = row.get("Commercials", "")
-                out["Platform"] = "Instagram"
-            # 2. Influencer Reel without Commercials
-            elif sheet == "Influencer Reel without Commercials":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Influencer Name"] = row.get("Username", "")
-                out["ID"] = row.get("ID", "")
-                out["Instagram Reel"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                try:
-                    likes = int(row.get("Likes",0)) if str(row.get("Likes",0)).isdigit() else 0
-                    comments = int(row.get("Comments",0)) if str(row.get("Comments",0)).isdigit() else 0
-                    shares = int(row.get("Shares",0)) if str(row.get("Shares",0)).isdigit() else 0
-                    out["Total Engagement"] = likes + comments + shares
-                except:
-                    out["Total Engagement"] = ""
-                out["Platform"] = "Instagram"
-            # 3. Chancellor Sir PR
-            elif sheet == "Chancellor Sir PR":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Channel name"] = row.get("Username", "")
-                out["Followers"] = row.get("Followers", "")
-                out["Live Reel Link"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["share"] = row.get("Shares", "")
-                out["Amount to Be Paid (INR)"] = row.get("Amount", "")
-                out["Date Posted"] = row.get("Date", "")
-                out["Payment Status"] = row.get("Payment Status", "")
-                out["Platform"] = "Instagram"
-            # 4. Campus Reel
-            elif sheet == "Campus Reel":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Account Name"] = row.get("Username", "")
-                out["ID"] = row.get("ID", "")
-                out["Link"] = row.get("Reel URL", "")
-                out["views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                out["Platform"] = "Instagram"
-            # 5. Meme Marketing
-            elif sheet == "Meme Marketing":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Page Name"] = row.get("Username", "")
-                out["link"] = row.get("Reel URL", "")
-                out["Live Reel Link"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                out["followers"] = row.get("Followers", "")
-                out["Platform"] = "Instagram"
-            # 6. Student Profiles
-            elif sheet == "Student Profiles":
-                out["Sr.No"] = idx+1
-                out["Name"] = row.get("Username", "")
-                out["Platform"] = "Instagram"
-                out["Profile/Channel Link"] = row.get("Reel URL", "")
-                out["Followers"] = row.get("Followers", "")
-                out["Number of Reels"] = row.get("Number of Reels", "")
-                out["Account Status"] = row.get("Account Status", "")
-            # 7. LPU Confess
-            elif sheet == "LPU Confess":
-                out["S.No"] = idx+1
-                out["Link"] = row.get("Reel URL", "")
-                out["Amount"] = row.get("Amount", "")
-                out["Status"] = row.get("Status", "")
-                out["Platform"] = "Instagram"
-            # 8. Long Term Promotion
-            elif sheet == "Long Term Promotion":
-                out["Sr.No"] = idx+1
-                out["Name"] = row.get("Username", "")
-                out["Platform"] = "Instagram"
-                out["Profile/Channel Link"] = row.get("Reel URL", "")
-                out["Followers"] = row.get("Followers", "")
-                out["Number of Reels"] = row.get("Number of Reels", "")
-                out["Commercials Per Reel"] = row.get("Commercials Per Reel", "")
-            # 9. Shoutout
-            elif sheet == "Shoutout":
-                out["S No."] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["ShortCode"] = row.get("ShortCode", "")
-                out["ID"] = row.get("ID", "")
-                out["Video Link"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                out["Platform"] = "Instagram"
-            # 10. InstaConfluence
-            elif sheet == "InstaConfluence":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Name"] = row.get("Username", "")
-                out["Platform"] = "Instagram"
-                out["Link"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Share"] = row.get("Shares", "")
-                out["Followers"] = row.get("Followers", "")
-            # 11. Diwali Competition
-            elif sheet == "Diwali Competition":
-                out["Timestamp"] = row.get("Date", "")
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Email Address"] = row.get("Email Address", "")
-                out["Name"] = row.get("Username", "")
-                out["Registration Number"] = row.get("Registration Number", "")
-                out["Mobile Number"] = row.get("Mobile Number", "")
-                out["Type of Content"] = row.get("Type of Content", "")
-                out["Link"] = row.get("Reel URL", "")
-                out["From where you come to know"] = row.get("From where you come to know", "")
-                out["shortcode"] = row.get("ShortCode", "")
-                out["ID"] = row.get("ID", "")
-                out["Plays"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                out["Points"] = row.get("Points", "")
-                out["Platform"] = "Instagram"
-            # 12. Olympics
-            elif sheet == "Olympics":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Influencer's Name"] = row.get("Username", "")
-                out["Platform"] = "Instagram"
-                out["Link"] = row.get("Reel URL", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Share"] = row.get("Shares", "")
-                out["Type of Influencer"] = row.get("Type of Influencer", "")
-                out["Shortcode"] = row.get("ShortCode", "")
-                out["id"] = row.get("ID", "")
-            # 13. Digital Star
-            elif sheet == "Digital Star":
-                out["Timestamp"] = row.get("Date", "")
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Email Address"] = row.get("Email Address", "")
-                out["Name"] = row.get("Username", "")
-                out["Registration Number"] = row.get("Registration Number", "")
-                out["Mobile Number"] = row.get("Mobile Number", "")
-                out["Themes"] = row.get("Theme", "")
-                out["Type of Content"] = row.get("Type of Content", "")
-                out["Link (Reel or Post on Instagram)"] = row.get("Reel URL", "")
-                out["shortcode"] = row.get("ShortCode", "")
-                out["ID"] = row.get("ID", "")
-                out["Plays"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comments"] = row.get("Comments", "")
-                out["Shares"] = row.get("Shares", "")
-                out["Platform"] = "Instagram"
-            # 14. Outcampus
-            elif sheet == "Outcampus":
-                out["S.No"] = idx+1
-                out["Month"] = pd.to_datetime(row.get("Date", ""), errors="coerce").strftime("%B-%Y") if row.get("Date") else ""
-                out["Link"] = row.get("Reel URL", "")
-                out["shortcode"] = row.get("ShortCode", "")
-                out["ID"] = row.get("ID", "")
-                out["Views"] = row.get("Views", "")
-                out["Likes"] = row.get("Likes", "")
-                out["Comment"] = row.get("Comments", "")
-                out["Share"] = row.get("Shares", "")
-                out["Platform"] = "Instagram"
-            return out
+        # --- Write to Output Sheets (all tabs, one batched transaction) ---
+        batch = SheetBatch(sh)
+        with metrics.stage("build layouts"):
+            for sheet, build_sheet in COMPILED_LAYOUTS.items():
+                if sheet not in positions:
+                    continue
+                batch.upsert(sheet, build_sheet(df.iloc[positions[sheet]]), key=OUTPUT_KEYS[sheet],
+                             remove_missing=source == "sheet", serial=OUTPUT_SERIALS[sheet],
+                             manual=unsourced_columns(SHEET_LAYOUTS[sheet], df.columns))
+        with metrics.stage("sheet write"):
+            results = batch.commit()
+        for sheet, result in results.items():
+            log.append(f"✅ {result['rows']} rows in {sheet} ({result['new']} new, {result['changed']} changed, {result['removed']} removed)")
+        log.append("🏷️ IG Classification/Segregation complete!")
 
-        # --- STEP 6: Write to Output Sheets (all tabs) ---
-        for sheet, columns in sheet_columns.items():
-            df_out = []
-            df_sheet = df[df["Assigned Sheet"] == sheet].reset_index(drop=True)
-            for i, row in df_sheet.iterrows():
-                df_out.append(fill_output_row(sheet, row, i))
-            if not df_out:
-                continue
-            out_df = pd.DataFrame(df_out, columns=columns)
+        with metrics.stage("analytics"):
             try:
-                sh.del_worksheet(sh.worksheet(sheet))
-            except:
-                pass
-            worksheet = sh.add_worksheet(sheet, rows="1000", cols=str(len(columns)))
-            worksheet.update([columns] + out_df.fillna("").values.tolist())
-            log.append(f"✅ {len(out_df)} rows written to {sheet}")
-        log.append("🏷️ IG Classification/Segregation complete!")
+                analytics.update("instagram", df, assignment_col)
+            except Exception as e:
+                log.append(f"⚠️ Could not update the analytics tables — {e}")
     except Exception as e:
         log.append(f"❌ Error: {str(e)}")
+        reporting.mark_failed(e)
     finally:
         for entry in log:
-            st.write(entry)
+            reporting.write(entry)
 
@@ -1,51 +1,114 @@
-import pandas as pd
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-import streamlit as st
-from apify_client import ApifyClient
-import gspread
-from google.oauth2.service_account import Credentials
-import os
-import json
-
-# Google Sheets Auth
-def get_gsheet_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    info = json.loads(st.secrets["SERVICE_ACCOUNT_JSON"])  # <-- THIS is the fix!
-    creds = Credentials.from_service_account_info(info, scopes=scope)
-    return gspread.authorize(creds)
+import archive
+import metrics
+import reporting
+from clients import get_apify_client, get_spreadsheet
+from checkpoints import Checkpoint
+from concurrency import retry, submit_in_context
+from scrape_cache import mark_scraped, should_scrape
+from records import REEL_SCHEMA, RecordBuffer, columns, with_placeholders
+from discovery_state import advance_watermarks, get_watermarks, mark_seen, seen_since
+from sheet_writer import upsert_worksheet
+
+def profile_username(url):
+    # https://www.instagram.com/<username>/ -> <username>
+    path = url.split("instagram.com/", 1)[-1]
+    return path.split("?")[0].strip("/").split("/")[0].lower()
+
+# Returns item -> source profile URL for the items of a batched profile run,
+# matched by the actor's inputUrl or else the post's ownerUsername (None if
+# neither matches).
+def make_attributor(profile_urls):
+    by_url = {url.rstrip("/").lower(): url for url in profile_urls}
+    by_username = {profile_username(url): url for url in profile_urls}
+
+    def attribute(item):
+        return (by_url.get(str(item.get("inputUrl") or "").rstrip("/").lower())
+                or by_username.get(str(item.get("ownerUsername") or "").lower()))
+    return attribute
+
+# Columns read from each scraped post (records.REEL_SCHEMA), followed by the
+# columns analysts fill in on the "Discovered IG Reels" tab (with their
+# initial values), which are only added when the tab is written.
+REEL_COLUMNS = columns(REEL_SCHEMA)
+PLACEHOLDER_COLUMNS = {
+    "Assigned Type": "", "Theme": "", "Influencer Name": "", "Tag Usernames": "", "Commercials": "",
+    "Remarks": "", "Followers": "", "Platform": "Instagram", "Email Address": "", "Mobile Number": "",
+    "Registration Number": "", "Type of Content": "", "Points": "", "Shortcode": "", "ID": "",
+    "Type of Influencer": "", "Account Status": "", "Payment Status": "", "Number of Reels": ""
+}
+
+# One scraped post -> record in REEL_SCHEMA order, or None if it is
+# unreadable or older than the cutoff.
+def parse_apify_item(item, cutoff_date):
+    try:
+        dt = datetime.fromisoformat(item.get("timestamp").replace("Z", ""))
+        if dt < cutoff_date:
+            return None
+    except Exception:
+        return None
+    return (
+        item.get("url"),
+        item.get("ownerUsername"),
+        item.get("caption"),
+        dt.date().isoformat(),
+        item.get("likesCount", 0),
+        item.get("commentsCount", 0),
+        item.get("videoPlayCount", 0)
+    )
 
 # --- MAIN DISCOVERY FUNCTION ---
-def run_ig_discovery(days_back: int, skip_if_scraped_hours: int = 8):
+# With incremental=True (the default) each profile / hashtag only keeps posts
+# newer than its watermark (newest post kept by an earlier run), reels found
+# before are skipped and only the new ones are added to the tab. With
+# incremental=False the whole window is kept and the tab is replaced.
+# Every finished actor run's kept reels are checkpointed; resume=True
+# continues the last run that did not complete, over its original window,
+# and only scrapes the profiles and hashtags it had not finished.
+def run_ig_discovery(days_back: int, skip_if_scraped_hours: int = 8, max_concurrent_runs: int = 4,
+                     run_memory_mbytes: int = None, profile_batch_size: int = 10, incremental: bool = True,
+                     resume: bool = False):
     log = []
     try:
-        log.append(f"🔎 IG Discovery (Apify) — {days_back} days back, skip if scraped {skip_if_scraped_hours}h")
-        cutoff_date = datetime.utcnow() - timedelta(days=days_back)
+        checkpoint = Checkpoint("ig_discovery", {
+            "days_back": days_back, "incremental": incremental,
+            "cutoff": (datetime.utcnow() - timedelta(days=days_back)).isoformat(timespec="seconds")
+        }, resume)
+        days_back, incremental = checkpoint.params["days_back"], checkpoint.params["incremental"]
+        mode = "new reels only" if incremental else "full window"
+        log.append(f"🔎 IG Discovery (Apify) — {days_back} days back, skip if scraped {skip_if_scraped_hours}h ({mode})")
+        if checkpoint.resumed:
+            log.append(f"♻️ Resuming the run started {checkpoint.started_at:%Y-%m-%d %H:%M} UTC "
+                       f"({len(checkpoint.units)} actor runs already collected)")
+        elif resume:
+            log.append("♻️ No unfinished run to resume, starting a new one")
+        cutoff_date = datetime.fromisoformat(checkpoint.params["cutoff"])
         scrape_cutoff = datetime.utcnow() - timedelta(hours=skip_if_scraped_hours)
-        APIFY_TOKEN = st.secrets["APIFY_TOKEN"]
 
         # Load Google Sheet Profiles
-        SHEET_NAME = st.secrets["GOOGLE_SHEET_NAME"]
         INPUT_TAB = "IG Input Pages"
-        client = get_gsheet_client()
-        sh = client.open(SHEET_NAME)
-        ws_profiles = sh.worksheet(INPUT_TAB)
-        profile_urls = [row[0] for row in ws_profiles.get_all_values()[1:] if row and row[0].startswith("https://")]
+        sh = get_spreadsheet()
+        with metrics.stage("sheet read"):
+            ws_profiles = metrics.call("sheets", "worksheet", sh.worksheet, INPUT_TAB, measure=False)
+            profile_rows = metrics.call("sheets", "values.get", ws_profiles.get_all_values)
+        profile_urls = [row[0] for row in profile_rows[1:] if row and row[0].startswith("https://")]
         hashtags = [
             "lpulife", "lpuplacements", "lovelyprofessionaluniversity",
             "lpuvlogs", "lifeatlpu", "lpu", "lpucampus", "lpuhostel"
         ]
 
-        # Cache
-        CACHE_FILE = "scraped_cache.csv"
-        if os.path.exists(CACHE_FILE):
-            scrape_cache = pd.read_csv(CACHE_FILE)
-            scrape_cache["last_scraped"] = pd.to_datetime(scrape_cache["last_scraped"])
-        else:
-            scrape_cache = pd.DataFrame(columns=["type", "value", "last_scraped"])
-        
-        client_apify = ApifyClient(APIFY_TOKEN)
+        tag_ids = [f"#{tag}" for tag in hashtags]
+        watermarks = get_watermarks("instagram", profile_urls + tag_ids) if incremental else {}
+        seen_urls = seen_since("instagram", cutoff_date) if incremental else set()
+
+        def source_cutoff(source):
+            return max(cutoff_date, watermarks.get(source, cutoff_date))
+
+        client_apify = get_apify_client()
 
-        def run_apify_scraper(direct_urls, search_type):
+        def run_apify_scraper(direct_urls, search_type, newer_than):
             run_input = {
                 "directUrls": direct_urls if search_type == "user" else [],
                 "hashtag": direct_urls[0].replace("#", "") if search_type == "hashtag" else "",
@@ -53,108 +116,153 @@ def run_ig_discovery(days_back: int, skip_if_scraped_hours: int = 8):
                 "resultsLimit": 50,
                 "searchType": search_type,
                 "searchLimit": 1,
-                "addParentData": True
+                "addParentData": True,
+                "onlyPostsNewerThan": newer_than.date().isoformat()
             }
             actor = client_apify.actor("shu8hvrXbJbY3Eb9W")
-            run = actor.call(run_input=run_input)
-            return list(client_apify.dataset(run["defaultDatasetId"]).iterate_items())
-
-        def should_scrape(source_type, value):
-            recent = scrape_cache[
-                (scrape_cache["type"] == source_type) &
-                (scrape_cache["value"] == value)
-            ]
-            if recent.empty:
-                return True
-            return recent["last_scraped"].iloc[0] < scrape_cutoff
-
-        profile_results, hashtag_results = [], []
+            # The start request and the wait are retried separately: retrying a
+            # blocking actor.call would launch another paid run while the first
+            # may still be going
+            launched = retry(metrics.call, "apify", "actor.start", actor.start, run_input=run_input,
+                             memory_mbytes=run_memory_mbytes, measure=False)
+            run = retry(metrics.call, "apify", "run.wait_for_finish", client_apify.run(launched["id"]).wait_for_finish,
+                        measure=False, units=lambda run: ((run or {}).get("stats") or {}).get("computeUnits") or 0)
+            if run is None:
+                raise RuntimeError(f"Apify run {launched['id']} not found")
+            # Only the time spent waiting on the dataset counts, not our parsing
+            items, waited = iter(client_apify.dataset(run["defaultDatasetId"]).iterate_items()), 0.0
+            while True:
+                started = time.perf_counter()
+                item = next(items, None)
+                waited += time.perf_counter() - started
+                if item is None:
+                    break
+                yield item
+            metrics.record("apify", "dataset.iterate_items", waited)
+
+        # Runs in a worker thread: parses the dataset while it streams in and
+        # keeps only (source, row, publish time) for posts newer than their
+        # source's cutoff and not discovered before, one per Reel URL.
+        def collect_run(source_type, sources):
+            search_type = "user" if source_type == "profile" else "hashtag"
+            attribute = make_attributor(sources) if source_type == "profile" else (lambda item: sources[0])
+            batch_cutoff = min(source_cutoff(source) for source in sources)
+            kept, seen, scanned = [], set(seen_urls), 0
+            for item in run_apify_scraper(sources, search_type, batch_cutoff):
+                scanned += 1
+                source = attribute(item)
+                row = parse_apify_item(item, source_cutoff(source) if source else batch_cutoff)
+                if row is None or row[0] in seen:
+                    continue
+                seen.add(row[0])
+                kept.append((source, row, datetime.fromisoformat(item["timestamp"].replace("Z", ""))))
+            return kept, scanned
+
+        # Sources whose actor run a resumed run already collected
+        collected = {source for unit in checkpoint.units.values() for source in unit["sources"]}
+
+        # (source type, sources) per actor run: profiles due a scrape are packed
+        # profile_batch_size to a run, hashtags run one at a time
+        due_profiles = []
         for url in profile_urls:
-            if should_scrape("profile", url):
-                try:
-                    st.info(f"Scraping profile: {url}")
-                    profile_results.extend(run_apify_scraper([url], "user"))
-                    scrape_cache = scrape_cache[scrape_cache["value"] != url]
-                    scrape_cache = pd.concat([scrape_cache, pd.DataFrame([{
-                        "type": "profile", "value": url, "last_scraped": datetime.utcnow()
-                    }])], ignore_index=True)
-                except Exception as e:
-                    st.warning(f"⚠️ Profile scrape failed: {url} — {e}")
+            if url in collected:
+                continue
+            if should_scrape("profile", url, scrape_cutoff):
+                due_profiles.append(url)
             else:
-                st.info(f"⏩ Skipped profile (already scraped): {url}")
-        for tag in hashtags:
-            tag_id = f"#{tag}"
-            if should_scrape("hashtag", tag_id):
-                try:
-                    st.info(f"Scraping hashtag: {tag_id}")
-                    hashtag_results.extend(run_apify_scraper([tag_id], "hashtag"))
-                    scrape_cache = scrape_cache[scrape_cache["value"] != tag_id]
-                    scrape_cache = pd.concat([scrape_cache, pd.DataFrame([{
-                        "type": "hashtag", "value": tag_id, "last_scraped": datetime.utcnow()
-                    }])], ignore_index=True)
-                except Exception as e:
-                    st.warning(f"⚠️ Hashtag scrape failed: {tag_id} — {e}")
+                reporting.info(f"⏩ Skipped profile (already scraped): {url}")
+        scrape_jobs = [("profile", due_profiles[i:i+profile_batch_size])
+                       for i in range(0, len(due_profiles), max(1, profile_batch_size))]
+        for tag_id in tag_ids:
+            if tag_id in collected:
+                continue
+            if should_scrape("hashtag", tag_id, scrape_cutoff):
+                scrape_jobs.append(("hashtag", [tag_id]))
             else:
-                st.info(f"⏩ Skipped hashtag (already scraped): {tag_id}")
-
-        def parse_apify_data(raw_items):
-            rows = []
-            for item in raw_items:
-                try:
-                    dt = datetime.fromisoformat(item.get("timestamp").replace("Z", ""))
-                    if dt >= cutoff_date:
-                        rows.append({
-                            "Reel URL": item.get("url"),
-                            "Username": item.get("ownerUsername"),
-                            "Caption": item.get("caption"),
-                            "Date": dt.date().isoformat(),
-                            "Likes": item.get("likesCount", 0),
-                            "Comments": item.get("commentsCount", 0),
-                            "Views": item.get("videoPlayCount", 0),
-                            "Assigned Type": "",
-                            "Theme": "",
-                            "Influencer Name": "",
-                            "Tag Usernames": "",
-                            "Commercials": "",
-                            "Remarks": "",
-                            "Followers": "",
-                            "Platform": "Instagram",
-                            "Email Address": "",
-                            "Mobile Number": "",
-                            "Registration Number": "",
-                            "Type of Content": "",
-                            "Points": "",
-                            "Shortcode": "",
-                            "ID": "",
-                            "Type of Influencer": "",
-                            "Account Status": "",
-                            "Payment Status": "",
-                            "Number of Reels": ""
-                        })
-                except Exception:
-                    continue
-            return pd.DataFrame(rows)
+                reporting.info(f"⏩ Skipped hashtag (already scraped): {tag_id}")
 
-        df_profiles = parse_apify_data(profile_results)
-        df_hashtags = parse_apify_data(hashtag_results)
-        df_all = pd.concat([df_profiles, df_hashtags], ignore_index=True)
-        df_all = df_all.drop_duplicates(subset=["Reel URL"]).reset_index(drop=True)
+        # Up to max_concurrent_runs actor runs at once (keep within the Apify
+        # memory limit); each dataset is collected as soon as its run finishes.
+        # A failed profile batch is split in half and retried, so one bad
+        # source only costs its own results.
+        reels, scanned_total, published = RecordBuffer(REEL_SCHEMA, key="Reel URL"), 0, {}
+        new_reels = []
+        total_sources, finished_sources = sum(len(sources) for _, sources in scrape_jobs), 0
 
-        def write_to_sheet(sheet_name, dataframe):
-            try:
-                sh.del_worksheet(sh.worksheet(sheet_name))
-            except:
-                pass
-            worksheet = sh.add_worksheet(sheet_name, rows="1000", cols="30")
-            worksheet.update([dataframe.columns.tolist()] + dataframe.fillna("").values.tolist())
+        def merge(kept, scanned):
+            nonlocal scanned_total
+            scanned_total += scanned
+            for source, row, posted_at in kept:
+                if source is not None:
+                    published[source] = max(published.get(source, posted_at), posted_at)
+                if reels.append(row):
+                    new_reels.append((row[0], source, posted_at))
+
+        for unit in checkpoint.units.values():
+            merge([(source, tuple(row), datetime.fromisoformat(posted_at)) for source, row, posted_at in unit["kept"]],
+                  unit["scanned"])
+        with metrics.stage("scrape"), ThreadPoolExecutor(max_workers=max(1, max_concurrent_runs)) as pool:
+            pending = {}
+
+            def submit(source_type, sources):
+                reporting.info(f"Scraping {source_type}: {', '.join(sources)}")
+                pending[submit_in_context(pool, collect_run, source_type, sources)] = (source_type, sources)
 
-        write_to_sheet("Discovered IG Reels", df_all)
-        log.append(f"✅ {len(df_all)} new reels saved to 'Discovered IG Reels'. Token usage optimized.")
+            for source_type, sources in scrape_jobs:
+                submit(source_type, sources)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_type, sources = pending.pop(future)
+                    try:
+                        kept, scanned = future.result()
+                    except Exception as e:
+                        if len(sources) > 1:
+                            reporting.warning(f"⚠️ Batch of {len(sources)} profiles failed, retrying in smaller batches — {e}")
+                            half = len(sources) // 2
+                            submit(source_type, sources[:half])
+                            submit(source_type, sources[half:])
+                        else:
+                            reporting.warning(f"⚠️ {source_type.capitalize()} scrape failed: {sources[0]} — {e}")
+                            finished_sources += 1
+                        continue
+                    finished_sources += len(sources)
+                    reporting.progress(finished_sources / max(total_sources, 1),
+                                       f"Scraped {finished_sources}/{total_sources} profiles and hashtags")
+                    checkpoint.save(f"{source_type}:{'|'.join(sources)}", {
+                        "sources": sources, "scanned": scanned,
+                        "kept": [(source, row, posted_at.isoformat()) for source, row, posted_at in kept]
+                    })
+                    merge(kept, scanned)
+                    for source in sources:
+                        mark_scraped(source_type, source)
 
-        # Save cache
-        scrape_cache.to_csv("scraped_cache.csv", index=False)
+        df_all = reels.to_frame()
+        if incremental:
+            log.append(f"📦 Scanned {scanned_total} posts, kept {len(df_all)} new reels ({len(seen_urls)} already known in this window)")
+        else:
+            log.append(f"📦 Scanned {scanned_total} posts, kept {len(df_all)} reels from the last {days_back} days")
+
+        with metrics.stage("sheet write"):
+            result = upsert_worksheet(sh, "Discovered IG Reels", with_placeholders(df_all, PLACEHOLDER_COLUMNS), key="Reel URL",
+                                      remove_missing=not incremental, manual=list(PLACEHOLDER_COLUMNS))
+
+        # Only remembered once they are in the sheet, so a failed write is retried next run
+        with metrics.stage("state update"):
+            mark_seen("instagram", new_reels)
+            advance_watermarks("instagram", published)
+            checkpoint.finish()
+        log.append(f"✅ {len(df_all)} reels saved to 'Discovered IG Reels' ({result['new']} new, {result['changed']} changed, {result['removed']} removed). Token usage optimized.")
+
+        # The sheet stays the source of truth, so a failed archive write only warns
+        with metrics.stage("archive"):
+            try:
+                archive.append("instagram", df_all)
+            except Exception as e:
+                log.append(f"⚠️ Could not archive this run — {e}")
     except Exception as e:
         log.append(f"❌ Error: {str(e)}")
+        reporting.mark_failed(e)
     finally:
         for entry in log:
-            st.write(entry)
+            reporting.write(entry)
@@ -0,0 +1,147 @@
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+import metrics
+
+# Column kinds for worksheet schemas
+COUNT = "count"          # nullable integer (Int64); "1,234" is accepted
+DATETIME = "datetime"    # UTC timestamps; ISO first, then any format
+CATEGORY = "category"    # stripped, lower-cased categorical (assignment types)
+TEXT = "text"
+
+
+def parse_dates(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    dates = pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True)
+    # Hand-typed dates that are not ISO get the slower per-value parser
+    retry = dates.isna() & values.astype(str).str.strip().ne("")
+    if retry.any():
+        fallback = pd.to_datetime(values[retry], errors="coerce", format="mixed", utc=True)
+        dates = dates.copy()
+        dates.loc[fallback.index] = fallback.astype(dates.dtype)
+    return dates
+
+
+def _coerce(raw, kind):
+    text = raw.astype(str).str.strip()
+    blank = text.eq("") | raw.isna()
+    if kind == COUNT:
+        numbers = pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce")
+        bad = ~blank & (numbers.isna() | (numbers % 1 != 0) | (numbers < 0))
+        return numbers.where(~bad).astype("Int64"), bad
+    if kind == DATETIME:
+        dates = parse_dates(raw.where(~blank, ""))
+        return dates, ~blank & dates.isna()
+    if kind == CATEGORY:
+        return text.str.lower().astype("category"), pd.Series(False, index=raw.index)
+    return text.where(~blank, ""), pd.Series(False, index=raw.index)
+
+
+# Column where coerce_frame keeps the cell text of a typed column
+def text_column(column):
+    return f"{column} (as typed)"
+
+
+# Converts the columns named in `schema` ({column: kind}) in place, one
+# vectorized step per column. Returns the frame and a validation report:
+# one (column, sheet row, value, kind) entry per cell that could not be read.
+# Columns listed in `keep_text` also keep their cell text in text_column(),
+# so it can be written back unchanged (see date_text).
+def coerce_frame(df, schema, keep_text=()):
+    report = []
+    for column, kind in schema.items():
+        if column not in df:
+            continue
+        raw = df[column]
+        if column in keep_text and raw.dtype == object:
+            df[text_column(column)] = raw
+        df[column], bad = _coerce(raw, kind)
+        for position in bad.to_numpy().nonzero()[0]:
+            report.append((column, position + 2, raw.iloc[position], kind))
+    return df, report
+
+
+# Numbers in untyped columns become int / float again, as gspread's
+# numericise did for get_all_records, so they are written back as numbers
+# rather than text. One vectorized pass per column; blanks stay "".
+def numericise(df, skip=()):
+    for column in df.columns:
+        if column in skip or df[column].dtype != object:
+            continue
+        text = df[column].astype(str).str.replace(",", "", regex=False)
+        numbers = pd.to_numeric(text.where(~text.str.contains("_", regex=False)), errors="coerce")
+        numeric = numbers.notna() & numbers.abs().ne(float("inf"))
+        if not numeric.any():
+            continue
+        integer = numeric & text.str.fullmatch(r"\s*[+-]?\d+\s*")
+        values = df[column].copy()
+        values[numeric & ~integer] = numbers[numeric & ~integer].astype(object)
+        values[integer] = text[integer].map(int).astype(object)
+        df[column] = values
+    return df
+
+
+def frame_from_values(values):
+    if not values:
+        return pd.DataFrame()
+    return pd.DataFrame(values[1:], columns=values[0], dtype=object)
+
+
+# Reads a worksheet once (one values.get, no per-cell API numericising),
+# applies the schema and turns numbers in the other columns back into
+# numbers. Pass schema=None to only numericise.
+def read_worksheet(worksheet, schema=None, keep_text=()):
+    df = frame_from_values(metrics.call("sheets", "values.get", worksheet.get_all_values))
+    df = numericise(df, skip=schema or ())
+    if schema is None:
+        return df, []
+    return coerce_frame(df, schema, keep_text)
+
+
+def read_header(worksheet):
+    return metrics.call("sheets", "values.get", worksheet.row_values, 1)
+
+
+# Reads only the named columns (those present in the header) in one
+# values.batchGet, for callers that hold the rest of the data elsewhere.
+# Numbers come back numericised, as from read_worksheet.
+def read_columns(worksheet, columns, header=None):
+    header = header if header is not None else read_header(worksheet)
+    present = [column for column in dict.fromkeys(columns) if column in header]
+    if not present:
+        return pd.DataFrame()
+    letters = [rowcol_to_a1(1, header.index(column) + 1)[:-1] for column in present]
+    value_ranges = metrics.call("sheets", "values.batchGet", worksheet.batch_get, [f"{c}2:{c}" for c in letters])
+    cells = [[row[0] if row else "" for row in values] for values in value_ranges]
+    length = max(len(column) for column in cells)
+    return numericise(pd.DataFrame({column: values + [""] * (length - len(values))
+                                    for column, values in zip(present, cells)}, dtype=object))
+
+
+def summarize_report(report, limit=5):
+    lines = []
+    by_column = {}
+    for column, row, value, kind in report:
+        by_column.setdefault(column, []).append((row, value, kind))
+    for column, cells in by_column.items():
+        examples = ", ".join(f"row {row}: '{value}'" for row, value, _ in cells[:limit])
+        more = f" (+{len(cells) - limit} more)" if len(cells) > limit else ""
+        lines.append(f"⚠️ {len(cells)} unreadable {cells[0][2]} cell(s) in '{column}' — {examples}{more}")
+    return lines
+
+
+# A typed date column back as sheet text: the cell as it was typed where
+# coerce_frame kept one, so hand-typed and unreadable dates are written back
+# unchanged; dates without cell text (e.g. from the archive) are formatted
+# the way discovery writes them.
+def date_text(df, column, format):
+    dates = df[column].dt.strftime(format).fillna("")
+    if text_column(column) not in df:
+        return dates
+    text = df[text_column(column)].fillna("").astype(str)
+    return text.where(text.str.strip().ne(""), dates)
+
+
+# Sheet-ready rows: missing values become "" and typed values plain Python.
+def sheet_values(df):
+    return df.astype(object).where(df.notna(), "").values.tolist()
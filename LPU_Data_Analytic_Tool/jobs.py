@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import metrics
+import reporting
+from local_store import get_connection, ensure_schema
+
+# Background jobs for the pipelines, so a run no longer blocks the Streamlit
+# script thread and a rerun of the page does not cancel it halfway.
+# The registry lives in this module and is shared by every session of the
+# process. At most one job per pipeline is queued or running at a time, whatever
+# its arguments: two runs of a pipeline would write the same tab from stale
+# reads and share its discovery state and checkpoint, so the caller gets the
+# active job back instead.
+# The same holds across processes (the app and cli.py, or two app servers on
+# one database): a job holds its pipeline's row in job_locks from submit to
+# finish, and submit raises PipelineBusy while another process holds it. A
+# row left behind by a process that died on this host is taken over.
+# Finished jobs are recorded in the job_history table. Job messages are also
+# logged (logger "lpu.jobs"), which is all a headless run shows.
+
+MAX_WORKERS = 2
+KEEP_FINISHED = 50
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS job_history (
+        job_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        params TEXT NOT NULL,
+        status TEXT NOT NULL,
+        submitted_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        error TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS job_history_name ON job_history (name, finished_at)",
+    """
+    CREATE TABLE IF NOT EXISTS job_locks (
+        name TEXT PRIMARY KEY,
+        job_id TEXT NOT NULL,
+        host TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        acquired_at TEXT NOT NULL
+    )
+    """
+)
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="lpu-job")
+_lock = threading.Lock()
+_jobs = {}      # job_id -> Job, in submission order
+_active = {}    # name -> Job still queued or running
+
+logger = logging.getLogger("lpu.jobs")
+LOG_LEVELS = {"error": logging.ERROR, "warning": logging.WARNING}
+
+HOST = socket.gethostname()
+
+
+# Raised by submit while another process runs the pipeline
+class PipelineBusy(RuntimeError):
+    def __init__(self, name, host, pid, since):
+        self.name, self.host, self.pid, self.since = name, host, pid, since
+        where = f"process {pid}" if host == HOST else f"process {pid} on {host}"
+        super().__init__(f"{name} is already running in {where} (since {since:%H:%M} UTC)")
+
+
+class Job:
+    def __init__(self, name, params):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.params = params
+        self.status = QUEUED
+        self.progress = None
+        self.progress_text = None
+        self.messages = []
+        self.error = None
+        self.submitted_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    # reporting sink
+    def report(self, level, message):
+        with self._lock:
+            self.messages.append((level, message))
+        logger.log(LOG_LEVELS.get(level, logging.INFO), "[%s] %s", self.name, message)
+        if level == "error" and self.error is None:
+            self.error = str(message)
+
+    def set_progress(self, fraction, text=None):
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        self.progress_text = text
+        if text:
+            logger.info("[%s] %s", self.name, text)
+
+    def fail(self, reason):
+        self.error = str(reason)
+        logger.error("[%s] failed: %s", self.name, reason)
+
+    # Blocks until the job finished; returns False on timeout
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def get_messages(self):
+        with self._lock:
+            return list(self.messages)
+
+
+def _record(job):
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO job_history "
+            "(job_id, name, params, status, submitted_at, started_at, finished_at, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.id, job.name, json.dumps(job.params, sort_keys=True, default=str), job.status,
+             job.submitted_at.isoformat(), job.started_at and job.started_at.isoformat(),
+             job.finished_at and job.finished_at.isoformat(), job.error)
+        )
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Takes the pipeline's row in job_locks for `job`, or raises PipelineBusy.
+# Called under _lock with no active job of that name in this process, so a
+# row of this process is one a crashed job left behind.
+def _acquire(job):
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT host, pid, acquired_at FROM job_locks WHERE name = ?", (job.name,)).fetchone()
+        if row is not None:
+            host, pid, acquired_at = row
+            if host != HOST or (pid != os.getpid() and _alive(pid)):
+                raise PipelineBusy(job.name, host, pid, datetime.fromisoformat(acquired_at))
+        conn.execute(
+            "INSERT OR REPLACE INTO job_locks (name, job_id, host, pid, acquired_at) VALUES (?, ?, ?, ?, ?)",
+            (job.name, job.id, HOST, os.getpid(), job.submitted_at.isoformat())
+        )
+
+
+def _release(job):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM job_locks WHERE name = ? AND job_id = ?", (job.name, job.id))
+
+
+def _run(job, func):
+    job.status, job.started_at = RUNNING, datetime.utcnow()
+    token = reporting.use_sink(job)
+    try:
+        with metrics.run(job.name, job.id):
+            func(**job.params)
+    except Exception as e:
+        job.report("error", f"❌ Error: {str(e)}")
+        job.fail(e)
+    finally:
+        reporting.reset_sink(token)
+        job.finished_at = datetime.utcnow()
+        job.status = FAILED if job.error is not None else SUCCEEDED
+        try:
+            _release(job)
+        except Exception as e:
+            job.report("warning", f"⚠️ Could not release the pipeline lock — {e}")
+        with _lock:
+            _active.pop(job.name, None)
+            finished = [job_id for job_id, other in _jobs.items() if other.done]
+            for job_id in finished[:-KEEP_FINISHED]:
+                del _jobs[job_id]
+        try:
+            _record(job)
+        except Exception as e:
+            job.report("warning", f"⚠️ Could not save job history — {e}")
+        job._finished.set()
+
+
+# Returns (job, started): started is False when a job of the same pipeline
+# was already queued or running (possibly with other params) and that job is
+# returned instead. Raises PipelineBusy when another process runs it.
+def submit(name, func, **params):
+    with _lock:
+        job = _active.get(name)
+        if job is not None:
+            return job, False
+        job = Job(name, params)
+        _acquire(job)
+        _jobs[job.id] = job
+        _active[name] = job
+    _pool.submit(_run, job, func)
+    return job, True
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
+
+
+def active_jobs(name=None):
+    with _lock:
+        return [job for job in _active.values() if name is None or job.name == name]
+
+
+# Latest finished run of `name` from the history table, as a dict (or None)
+def last_run(name):
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    row = conn.execute(
+        "SELECT job_id, name, params, status, submitted_at, started_at, finished_at, error FROM job_history "
+        "WHERE name = ? AND finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT 1",
+        (name,)
+    ).fetchone()
+    if row is None:
+        return None
+    run = dict(zip(("job_id", "name", "params", "status", "submitted_at", "started_at", "finished_at", "error"), row))
+    run["params"] = json.loads(run["params"])
+    for field in ("submitted_at", "started_at", "finished_at"):
+        run[field] = datetime.fromisoformat(run[field]) if run[field] else None
+    return run
@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import threading
+
+# Local SQLite database shared by the caches and stores of all pipelines.
+# Override the location with the LPU_LOCAL_DB environment variable.
+DEFAULT_DB_PATH = "lpu_local.db"
+
+_local = threading.local()
+
+
+def db_path():
+    return os.environ.get("LPU_LOCAL_DB", DEFAULT_DB_PATH)
+
+
+# sqlite3 connections may not be shared between threads, so every thread
+# keeps its own (per database path). WAL lets readers and one writer from
+# different threads or Streamlit sessions work side by side.
+def get_connection():
+    path = db_path()
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[path] = conn
+    return conn
+
+
+# Runs a module's schema statements once per connection. The stores call
+# this on every access, so later calls must be a lookup: executing the
+# statements again (e.g. an INSERT OR IGNORE seed row) would take the write
+# lock and commit on every read.
+def ensure_schema(conn, *statements):
+    ready = getattr(_local, "schemas", None)
+    if ready is None:
+        ready = _local.schemas = set()
+    if (id(conn), statements) in ready:
+        return
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+    ready.add((id(conn), statements))
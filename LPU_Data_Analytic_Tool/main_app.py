@@ -1,10 +1,17 @@
+import time
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
-from ig_discovery import run_ig_discovery
-from ig_classification import run_ig_classification
-from yt_discovery import run_yt_discovery
-from yt_classification import run_yt_classification
+from pipelines import PIPELINES, pipeline_function
+from checkpoints import pending
+from jobs import SUCCEEDED, PipelineBusy, active_jobs, get_job, last_run, submit
+from metrics import recent_runs, run_entries
 from datetime import datetime
 
+# Heavy modules (pandas, the pipelines and their API clients) are imported
+# where they are first needed: only the selected tab and open expanders run,
+# and pipelines are imported by the job that runs them.
+
 # --- Custom Styles & Logo ---
 st.markdown(
     """
@@ -44,49 +51,214 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# --- Background jobs ---
+# Runs go to the job runner (jobs.py) so reruns of this page do not cancel
+# them; the page keeps the job id in the session and polls it.
+JOB_LABELS = {name: label for name, (label, _) in PIPELINES.items()}
+SUCCESS_MESSAGES = {
+    "yt_discovery": "YouTube Discovery complete! 🚀\n\n**Before running Classification, open your Google Sheet and fill in the 'Assigned Type' column for the new videos.**",
+    "yt_classification": "YouTube Classification complete! ✅",
+    "ig_discovery": "Instagram Discovery complete! 🚀\n\n**Before running Classification, open your Google Sheet and fill in the 'Assignment Type' column for the new reels.**",
+    "ig_classification": "Instagram Classification complete! ✅",
+}
+
+def last_run_bar(label, name):
+    run = last_run(name)
+    if run is None:
+        text = "Never"
+    else:
+        minutes = (run["finished_at"] - (run["started_at"] or run["finished_at"])).total_seconds() / 60
+        text = f"{run['finished_at']:%Y-%m-%d %H:%M} UTC — {run['status']} ({minutes:.1f} min)"
+    st.markdown(f'<div class="bluebar">Last {label}: {text}</div>', unsafe_allow_html=True)
+
+def start_job(state_key, name, **params):
+    try:
+        job, started = submit(name, pipeline_function(name), **params)
+    except PipelineBusy as e:
+        st.warning(f"{JOB_LABELS[name]} is already running outside this app ({e.host}, process {e.pid}, "
+                   f"since {e.since:%H:%M} UTC) — not started. Try again when it has finished.")
+        return
+    st.session_state[state_key] = job.id
+    if not started:
+        settings = "the same settings" if job.params == params else "other settings"
+        st.info(f"{JOB_LABELS[name]} is already running with {settings} (since {job.submitted_at:%H:%M} UTC) — "
+                "showing that run instead of starting another. Only one run per pipeline can run at a time.")
+
+def show_job(job):
+    for level, message in job.get_messages():
+        getattr(st, level)(message)
+    if not job.done:
+        st.progress(job.progress or 0.0, text=job.progress_text or f"{JOB_LABELS[job.name]} {job.status}...")
+    elif job.status == SUCCEEDED:
+        st.success(SUCCESS_MESSAGES[job.name])
+
+# Offers to continue a discovery run that failed partway (see checkpoints.py)
+def resume_option(name):
+    unfinished = pending(name)
+    if unfinished is None or active_jobs(name):
+        return False
+    started_at, units = unfinished
+    return st.checkbox(f"Resume the unfinished run from {started_at:%Y-%m-%d %H:%M} UTC ({units} finished steps kept)",
+                       value=True, key=f"{name}_resume")
+
+@st.fragment(run_every=2)
+def watch_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return
+    show_job(job)
+    if job.done:
+        st.rerun()  # refresh the last-run bars
+
+def job_status(state_key, names):
+    job = get_job(st.session_state.get(state_key))
+    for other in active_jobs():
+        if other.name in names and (job is None or other.id != job.id):
+            st.caption(f"⏳ {JOB_LABELS[other.name]} running since {other.submitted_at:%H:%M} UTC (started in another session)")
+    if job is None:
+        return
+    if job.done:
+        show_job(job)
+    else:
+        watch_job(job.id)
+
+# Stage / API-call breakdown of one run and trends over recent runs
+def metrics_panel(names):
+    runs = recent_runs(names)
+    if not runs:
+        st.caption("No runs recorded yet.")
+        return
+    import pandas as pd
+    history = pd.DataFrame(runs)
+    history["started_at"] = pd.to_datetime(history["started_at"])
+    history["run"] = history["pipeline"].map(JOB_LABELS) + " — " + history["started_at"].dt.strftime("%Y-%m-%d %H:%M")
+    choice = st.selectbox("Run", history["run"], key=f"metrics_run_{names[0]}")
+    selected = history[history["run"] == choice].iloc[0]
+    cols = st.columns(4)
+    cols[0].metric("Duration", f"{selected['seconds']:.1f} s")
+    cols[1].metric("API calls", int(selected["api_calls"]))
+    cols[2].metric("YouTube quota", int(selected["quota_units"]))
+    cols[3].metric("Apify compute units", f"{selected['compute_units']:.3f}")
+
+    entries = pd.DataFrame(run_entries(selected["run_id"]))
+    if not entries.empty:
+        entries["seconds"] = entries["seconds"].round(2)
+        stages = entries[entries["kind"] == "stage"]
+        calls = entries[entries["kind"] == "call"]
+        st.markdown("**Stages**")
+        st.bar_chart(stages.set_index("name")["seconds"], horizontal=True)
+        st.markdown("**API calls**")
+        st.dataframe(calls.drop(columns="kind").rename(columns={"name": "call", "units": "quota / CU"}), hide_index=True)
+
+    st.markdown("**Trends**")
+    trend = history.pivot_table(index="started_at", columns="pipeline", values=["seconds", "quota_units"])
+    st.line_chart(trend["seconds"].rename(columns=JOB_LABELS), y_label="seconds")
+    if trend["quota_units"].to_numpy().any():
+        st.line_chart(trend["quota_units"].rename(columns=JOB_LABELS), y_label="YouTube quota units")
+
+# --- Analytics ---
+# The aggregates only change when a classification run bumps the data
+# version, so reruns are answered from st.cache_data.
+ANALYTICS_DIMENSIONS = {
+    "Month": "month",
+    "Assignment type": "assignment",
+    "Channel / influencer": "creator",
+    "Platform": "platform",
+}
+
+@st.cache_data(show_spinner=False)
+def analytics_totals(version):
+    import analytics
+    return analytics.totals()
+
+@st.cache_data(show_spinner=False)
+def analytics_grouped(version, dimension, platforms):
+    import analytics
+    return analytics.grouped(analytics_totals(version), dimension, list(platforms))
+
+def analytics_panel():
+    import analytics
+    version = analytics.data_version()
+    totals = analytics_totals(version)
+    if totals.empty:
+        st.info("No data yet — run a Classification to fill the analytics.")
+        return
+    platforms = st.multiselect("Platforms", sorted(totals["platform"].unique()),
+                               default=sorted(totals["platform"].unique()), key="analytics_platforms")
+    label = st.radio("Group by", list(ANALYTICS_DIMENSIONS), horizontal=True, key="analytics_dimension")
+    grouped = analytics_grouped(version, ANALYTICS_DIMENSIONS[label], tuple(platforms))
+
+    cols = st.columns(3)
+    cols[0].metric("Videos / reels", f"{int(grouped['items'].sum()):,}")
+    cols[1].metric("Views", f"{int(grouped['views'].sum()):,}")
+    cols[2].metric("Engagement", f"{int(grouped['engagement'].sum()):,}")
+
+    top = grouped if label in ("Month", "Platform") else grouped.head(25)
+    if label == "Month":
+        st.line_chart(top[["views", "engagement"]])
+    else:
+        st.bar_chart(top[["views", "engagement"]], horizontal=True, stack=False)
+    st.dataframe(grouped.rename_axis(label).rename(columns=str.capitalize))
+
 # --- Title and Subtitle ---
 st.markdown('<div class="main-title">LPU Data Analytic Tool</div>', unsafe_allow_html=True)
 st.markdown('<div class="subtitle">For internal use – LPU marketing & analytics team</div>', unsafe_allow_html=True)
 
 # --- Tabs ---
-tabs = st.tabs(["YouTube", "Instagram"])
+tabs = st.tabs(["YouTube", "Instagram", "Analytics"], key="main_tabs", on_change="rerun")
 
 # --- YouTube Tab ---
 with tabs[0]:
     st.header("YouTube Workflows")
-    # Blue status bars (could be made dynamic if you store last-run in session/file)
-    st.markdown('<div class="bluebar">Last Discovery: Never</div>', unsafe_allow_html=True)
-    st.markdown('<div class="bluebar">Last Classification: Never</div>', unsafe_allow_html=True)
+    if tabs[0].open:
+        last_run_bar("Discovery", "yt_discovery")
+        last_run_bar("Classification", "yt_classification")
 
-    yt_task = st.radio("Task", options=["Discovery", "Classification"], horizontal=True, key="yt_task")
-    yt_days_back = st.number_input("How many days back?", min_value=1, max_value=365, value=1, step=1, key="yt_days")
+        yt_task = st.radio("Task", options=["Discovery", "Classification"], horizontal=True, key="yt_task")
+        yt_days_back = st.number_input("How many days back?", min_value=1, max_value=365, value=1, step=1, key="yt_days")
 
-    if yt_task == "Discovery":
-        if st.button("Run YT Discovery"):
-            run_yt_discovery(days_back=yt_days_back)
-            st.success("YouTube Discovery complete! 🚀\n\n**Before running Classification, open your Google Sheet and fill in the 'Assigned Type' column for the new videos.**")
-    else:
-        st.warning("Please ensure the 'Assigned Type' column is filled in the 'Discovered Videos' sheet before running Classification. See the guide below.")
-        if st.button("Run YT Discovery"):
-            run_yt_classification(days_back=yt_days_back)
+        if yt_task == "Discovery":
+            yt_resume = resume_option("yt_discovery")
+            if st.button("Run YT Discovery"):
+                start_job("yt_job", "yt_discovery", days_back=yt_days_back, resume=yt_resume)
+        else:
+            st.warning("Please ensure the 'Assigned Type' column is filled in the 'Discovered Videos' sheet before running Classification. See the guide below.")
+            if st.button("Run YT Classification"):
+                start_job("yt_job", "yt_classification", days_back=yt_days_back)
+        job_status("yt_job", ("yt_discovery", "yt_classification"))
+        with st.expander("📈 Run metrics", key="yt_metrics", on_change="rerun") as panel:
+            if panel.open:
+                metrics_panel(["yt_discovery", "yt_classification"])
 
 # --- Instagram Tab ---
 with tabs[1]:
     st.header("Instagram Workflows")
-    st.markdown('<div class="bluebar">Last Discovery: Never</div>', unsafe_allow_html=True)
-    st.markdown('<div class="bluebar">Last Classification: Never</div>', unsafe_allow_html=True)
+    if tabs[1].open:
+        last_run_bar("Discovery", "ig_discovery")
+        last_run_bar("Classification", "ig_classification")
 
-    ig_task = st.radio("Task", options=["Discovery", "Classification"], horizontal=True, key="ig_task")
-    ig_days_back = st.number_input("How many days back?", min_value=1, max_value=365, value=1, step=1, key="ig_days")
+        ig_task = st.radio("Task", options=["Discovery", "Classification"], horizontal=True, key="ig_task")
+        ig_days_back = st.number_input("How many days back?", min_value=1, max_value=365, value=1, step=1, key="ig_days")
 
-    if ig_task == "Discovery":
-        if st.button("Run IG Discovery"):
-            run_ig_discovery(days_back=ig_days_back)
-            st.success("Instagram Discovery complete! 🚀\n\n**Before running Classification, open your Google Sheet and fill in the 'Assignment Type' column for the new reels.**")
-    else:
-        st.warning("Please ensure the 'Assignment Type' column is filled in the 'Discovered IG Reels' sheet before running Classification. See the guide below.")
-        if st.button("Run IG Classification"):
-            run_ig_classification(days_back=ig_days_back)
+        if ig_task == "Discovery":
+            ig_resume = resume_option("ig_discovery")
+            if st.button("Run IG Discovery"):
+                start_job("ig_job", "ig_discovery", days_back=ig_days_back, resume=ig_resume)
+        else:
+            st.warning("Please ensure the 'Assignment Type' column is filled in the 'Discovered IG Reels' sheet before running Classification. See the guide below.")
+            if st.button("Run IG Classification"):
+                start_job("ig_job", "ig_classification")
+        job_status("ig_job", ("ig_discovery", "ig_classification"))
+        with st.expander("📈 Run metrics", key="ig_metrics", on_change="rerun") as panel:
+            if panel.open:
+                metrics_panel(["ig_discovery", "ig_classification"])
+
+# --- Analytics Tab ---
+with tabs[2]:
+    st.header("Analytics")
+    if tabs[2].open:
+        st.caption("Views and engagement of every classified video and reel, updated after each Classification run.")
+        analytics_panel()
 
 # --- Assignment Type Guide Section ---
 st.markdown("---")
@@ -120,3 +292,20 @@ with st.expander("📸 Instagram Assignment Types"):
 | `digital_star`             | Digital Star                         |
 | `outcampus`                | Outcampus                            |
 """)
+
+# --- Page timing ---
+# The first script run in a process pays for the imports (cold start);
+# later runs are reruns. Shared by all sessions of this server.
+@st.cache_resource
+def script_timings():
+    return {"cold_start": None, "reruns": []}
+
+timings = script_timings()
+run_seconds = time.perf_counter() - SCRIPT_STARTED
+if timings["cold_start"] is None:
+    timings["cold_start"] = run_seconds
+else:
+    timings["reruns"] = (timings["reruns"] + [run_seconds])[-50:]
+reruns = sorted(timings["reruns"])
+median = f"{reruns[len(reruns) // 2]:.2f} s over the last {len(reruns)} reruns" if reruns else "no reruns yet"
+st.caption(f"⏱️ Page: this run {run_seconds:.2f} s · cold start {timings['cold_start']:.2f} s · median rerun {median}")
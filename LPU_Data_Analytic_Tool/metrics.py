@@ -0,0 +1,198 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import reporting
+from local_store import get_connection, ensure_schema
+
+# Per-run instrumentation: how long each pipeline stage took and what every
+# external call cost (count, time, payload bytes, errors, and estimated
+# YouTube quota units / Apify compute units). Pipelines mark stages with
+# `with stage(...)` and route API calls through `call(...)`; both are no-ops
+# outside `with run(...)`. Finished runs are saved to metric_runs /
+# metric_entries for the breakdown and trend panels in main_app.
+
+# YouTube Data API quota cost per call
+QUOTA_COSTS = {"youtube.search.list": 100, "youtube.videos.list": 1}
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS metric_runs (
+        run_id TEXT PRIMARY KEY,
+        pipeline TEXT NOT NULL,
+        job_id TEXT,
+        started_at TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        quota_units INTEGER NOT NULL,
+        compute_units REAL NOT NULL,
+        api_calls INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS metric_runs_pipeline ON metric_runs (pipeline, started_at)",
+    """
+    CREATE TABLE IF NOT EXISTS metric_entries (
+        run_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        bytes INTEGER NOT NULL,
+        errors INTEGER NOT NULL,
+        units REAL NOT NULL,
+        PRIMARY KEY (run_id, kind, name)
+    ) WITHOUT ROWID
+    """
+)
+
+ENTRY_FIELDS = ("count", "seconds", "bytes", "errors", "units")
+
+_current = contextvars.ContextVar("metrics_run", default=None)
+
+
+class RunMetrics:
+    def __init__(self, pipeline, job_id=None):
+        self.run_id = uuid.uuid4().hex
+        self.pipeline = pipeline
+        self.job_id = job_id
+        self.started_at = datetime.utcnow()
+        self.seconds = 0.0
+        self.entries = {}  # (kind, name) -> {count, seconds, bytes, errors, units}
+        self._lock = threading.Lock()
+
+    def add(self, kind, name, seconds, size=0, error=False, units=0):
+        with self._lock:
+            entry = self.entries.setdefault((kind, name), dict.fromkeys(ENTRY_FIELDS, 0))
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["bytes"] += size
+            entry["errors"] += int(error)
+            entry["units"] += units
+
+    def total(self, kind, field, prefix=""):
+        return sum(entry[field] for (k, name), entry in self.entries.items() if k == kind and name.startswith(prefix))
+
+    def summary(self):
+        return {
+            "seconds": round(self.seconds, 3),
+            "quota_units": int(self.total("call", "units", "youtube.")),
+            "compute_units": round(self.total("call", "units", "apify."), 4),
+            "api_calls": int(self.total("call", "count")),
+            "stages": {name: round(entry["seconds"], 3) for (kind, name), entry in self.entries.items() if kind == "stage"},
+        }
+
+
+def current():
+    return _current.get()
+
+
+def _payload_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+# Times one external call. `api` is "youtube", "apify" or "sheets". Bytes are
+# the size of `payload` (a request body) if given, else of a dict / list
+# response unless measure=False. `units(result)` overrides the quota cost.
+def call(api, method, func, *args, measure=True, payload=None, units=None, **kwargs):
+    metrics = _current.get()
+    if metrics is None:
+        return func(*args, **kwargs)
+    name = f"{api}.{method}"
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        metrics.add("call", name, time.perf_counter() - started, error=True, units=QUOTA_COSTS.get(name, 0))
+        raise
+    seconds = time.perf_counter() - started
+    if payload is not None:
+        size = _payload_size(payload)
+    else:
+        size = _payload_size(result) if measure and isinstance(result, (dict, list)) else 0
+    metrics.add("call", name, seconds, size, units=units(result) if units else QUOTA_COSTS.get(name, 0))
+    return result
+
+
+# Records an already-timed call, e.g. a streamed Apify dataset or a run's
+# compute units reported by the API.
+def record(api, method, seconds, size=0, error=False, units=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add("call", f"{api}.{method}", seconds, size, error, units)
+
+
+@contextmanager
+def stage(name):
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add("stage", name, time.perf_counter() - started)
+
+
+def _save(metrics):
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    summary = metrics.summary()
+    with conn:
+        conn.execute(
+            "INSERT INTO metric_runs (run_id, pipeline, job_id, started_at, seconds, quota_units, compute_units, api_calls) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (metrics.run_id, metrics.pipeline, metrics.job_id, metrics.started_at.isoformat(), summary["seconds"],
+             summary["quota_units"], summary["compute_units"], summary["api_calls"])
+        )
+        conn.executemany(
+            f"INSERT INTO metric_entries (run_id, kind, name, {', '.join(ENTRY_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(metrics.run_id, kind, name, *(entry[field] for field in ENTRY_FIELDS))
+             for (kind, name), entry in metrics.entries.items()]
+        )
+
+
+# Collects metrics for everything run inside the block (and in worker
+# threads started through concurrency.submit_in_context), then saves them.
+@contextmanager
+def run(pipeline, job_id=None, save=True):
+    metrics = RunMetrics(pipeline, job_id)
+    token = _current.set(metrics)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.seconds = time.perf_counter() - started
+        _current.reset(token)
+        if save:
+            try:
+                _save(metrics)
+            except Exception as e:
+                reporting.warning(f"⚠️ Could not save run metrics — {e}")
+
+
+# --- Reading back (main_app panels) ---
+
+def recent_runs(pipelines, limit=30):
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    rows = conn.execute(
+        f"SELECT run_id, pipeline, job_id, started_at, seconds, quota_units, compute_units, api_calls FROM metric_runs "
+        f"WHERE pipeline IN ({', '.join('?' * len(pipelines))}) ORDER BY started_at DESC LIMIT ?",
+        [*pipelines, limit]
+    ).fetchall()
+    fields = ("run_id", "pipeline", "job_id", "started_at", "seconds", "quota_units", "compute_units", "api_calls")
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def run_entries(run_id):
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    rows = conn.execute(
+        f"SELECT kind, name, {', '.join(ENTRY_FIELDS)} FROM metric_entries WHERE run_id = ? ORDER BY kind DESC, seconds DESC",
+        (run_id,)
+    ).fetchall()
+    return [dict(zip(("kind", "name") + ENTRY_FIELDS, row)) for row in rows]
@@ -0,0 +1,40 @@
+import importlib
+
+# The pipelines both front ends (main_app.py and cli.py) run through jobs.py.
+# name -> (label, "module:function"). Pipeline modules pull in pandas and
+# the Google / Apify clients, so they are only imported when a run starts.
+PIPELINES = {
+    "yt_discovery": ("YouTube Discovery", "yt_discovery:run_yt_discovery"),
+    "yt_classification": ("YouTube Classification", "yt_classification:run_yt_classification"),
+    "ig_discovery": ("Instagram Discovery", "ig_discovery:run_ig_discovery"),
+    "ig_classification": ("Instagram Classification", "ig_classification:run_ig_classification"),
+}
+
+# Per platform, in run order: classification reads what discovery wrote
+PLATFORMS = {
+    "youtube": ["yt_discovery", "yt_classification"],
+    "instagram": ["ig_discovery", "ig_classification"],
+}
+
+
+def load_pipeline(name):
+    module, function = PIPELINES[name][1].split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+# For jobs.submit: the import happens in the job's worker thread, so
+# starting a run from the app does not block the page on it.
+def pipeline_function(name):
+    def run(**params):
+        return load_pipeline(name)(**params)
+    return run
+
+
+def pipeline_params(name, days_back, incremental=True, source="sheet", resume=False):
+    if name in ("yt_discovery", "ig_discovery"):
+        return {"days_back": days_back, "incremental": incremental, "resume": resume}
+    if name == "yt_classification":
+        return {"days_back": days_back, "source": source}
+    if name == "ig_classification" and source == "archive":
+        return {"source": source, "days_back": days_back}
+    return {}
@@ -0,0 +1,70 @@
+import pandas as pd
+
+# Discovered content held column by column under a fixed schema. Appending
+# a record extends one list per column (no per-item dict), and the frame is
+# built from those lists with the declared dtypes, so pandas neither matches
+# keys row by row nor infers types. Sheet-only columns are not part of a
+# record; with_placeholders adds them when the frame is written.
+
+# (column, dtype) in record order
+VIDEO_SCHEMA = (
+    ("Video URL", "string"), ("Channel Name", "string"), ("Video Title", "string"), ("Publish Date", "string")
+)
+VIDEO_STATS_SCHEMA = (("Video URL", "string"), ("Views", "Int64"), ("Likes", "Int64"), ("Comments", "Int64"))
+REEL_SCHEMA = (
+    ("Reel URL", "string"), ("Username", "string"), ("Caption", "string"), ("Date", "string"),
+    ("Likes", "Int64"), ("Comments", "Int64"), ("Views", "Int64")
+)
+
+
+def columns(schema):
+    return [column for column, _ in schema]
+
+
+def _array(values, dtype):
+    try:
+        return pd.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        # A stray value of the wrong type (e.g. a count sent as text)
+        if dtype == "Int64":
+            return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("Int64").array
+        return pd.array([None if value is None else str(value) for value in values], dtype=dtype)
+
+
+# Records are tuples in schema order. With `key` (a column name) a record
+# whose key was appended before is dropped, so memory grows with the
+# records kept rather than the items scanned.
+class RecordBuffer:
+    def __init__(self, schema, key=None):
+        self.schema = schema
+        self._columns = [[] for _ in schema]
+        self._key = columns(schema).index(key) if key else None
+        self._seen = set()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        if self._key is not None:
+            if record[self._key] in self._seen:
+                return False
+            self._seen.add(record[self._key])
+        for values, value in zip(self._columns, record):
+            values.append(value)
+        self._count += 1
+        return True
+
+    def extend(self, records):
+        return sum(self.append(record) for record in records)
+
+    def column(self, name):
+        return self._columns[columns(self.schema).index(name)]
+
+    def to_frame(self):
+        return pd.DataFrame({column: _array(values, dtype) for (column, dtype), values in zip(self.schema, self._columns)})
+
+
+# Sheet-only columns ({column: initial value}) after the record columns
+def with_placeholders(df, placeholders):
+    return df.assign(**placeholders)
@@ -0,0 +1,56 @@
+import contextvars
+
+# Where pipeline messages go. Called from the Streamlit script thread they
+# are rendered straight away with st.*; inside a background job (see jobs.py)
+# they are collected by the job, which also logs them, so the page can show
+# them when it polls and headless runs (cli.py) get them in their log.
+
+_sink = contextvars.ContextVar("reporting_sink", default=None)
+
+
+def use_sink(sink):
+    return _sink.set(sink)
+
+
+def reset_sink(token):
+    _sink.reset(token)
+
+
+def _emit(level, message):
+    sink = _sink.get()
+    if sink is None:
+        import streamlit as st
+        getattr(st, level)(message)
+    else:
+        sink.report(level, message)
+
+
+def write(message):
+    _emit("write", message)
+
+
+def info(message):
+    _emit("info", message)
+
+
+def warning(message):
+    _emit("warning", message)
+
+
+def error(message):
+    _emit("error", message)
+
+
+# Fraction done (0..1); only shown for background jobs
+def progress(fraction, text=None):
+    sink = _sink.get()
+    if sink is not None:
+        sink.set_progress(fraction, text)
+
+
+# Pipelines catch their own exceptions to log them; this lets a job know
+# the run did not succeed.
+def mark_failed(reason):
+    sink = _sink.get()
+    if sink is not None:
+        sink.fail(reason)
@@ -0,0 +1,67 @@
+import os
+from datetime import datetime
+import pandas as pd
+from local_store import get_connection, ensure_schema
+
+# When each IG source (profile URL or #hashtag) was last scraped, keyed by
+# (type, value). Every write commits on its own, so a crash mid-run keeps
+# the progress made so far, and WAL lets two sessions share the table.
+
+LEGACY_CSV = "scraped_cache.csv"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_cache (
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    last_scraped TEXT NOT NULL,
+    PRIMARY KEY (type, value)
+) WITHOUT ROWID
+"""
+
+UPSERT = (
+    "INSERT INTO scrape_cache (type, value, last_scraped) VALUES (?, ?, ?) "
+    "ON CONFLICT(type, value) DO UPDATE SET last_scraped = max(last_scraped, excluded.last_scraped)"
+)
+
+
+# One-time import of the old CSV cache; the file is renamed afterwards.
+def _migrate_csv(conn):
+    if not os.path.exists(LEGACY_CSV):
+        return
+    legacy = pd.read_csv(LEGACY_CSV)
+    legacy["last_scraped"] = pd.to_datetime(legacy["last_scraped"], errors="coerce", format="ISO8601")
+    legacy = legacy.dropna(subset=["type", "value", "last_scraped"])
+    with conn:
+        conn.executemany(UPSERT, [
+            (source_type, value, last_scraped.to_pydatetime().isoformat())
+            for source_type, value, last_scraped in legacy[["type", "value", "last_scraped"]].itertuples(index=False)
+        ])
+    try:
+        os.replace(LEGACY_CSV, LEGACY_CSV + ".migrated")
+    except FileNotFoundError:
+        pass  # another session migrated it at the same time
+
+
+def _connection():
+    conn = get_connection()
+    ensure_schema(conn, SCHEMA)
+    _migrate_csv(conn)
+    return conn
+
+
+def last_scraped(source_type, value):
+    row = _connection().execute(
+        "SELECT last_scraped FROM scrape_cache WHERE type = ? AND value = ?", (source_type, value)
+    ).fetchone()
+    return datetime.fromisoformat(row[0]) if row else None
+
+
+def should_scrape(source_type, value, scrape_cutoff):
+    scraped_at = last_scraped(source_type, value)
+    return scraped_at is None or scraped_at < scrape_cutoff
+
+
+def mark_scraped(source_type, value, scraped_at=None):
+    conn = _connection()
+    with conn:
+        conn.execute(UPSERT, (source_type, value, (scraped_at or datetime.utcnow()).isoformat()))
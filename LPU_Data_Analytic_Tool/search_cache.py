@@ -0,0 +1,117 @@
+import time
+from local_store import get_connection, ensure_schema
+
+# Local copy of YouTube search results per keyword, plus the publish-time
+# ranges each keyword has been searched over (newest first, to exhaustion
+# or to the oldest result kept). A search for a window that overlaps
+# earlier ones is answered from here, and only the parts of the window no
+# earlier search covered go to the API (100 quota units per page).
+# Times are "YYYY-MM-DDTHH:MM:SSZ" text, the format of publishedAt, so they
+# compare as strings.
+
+# Coverage older than this is searched again, to pick up videos YouTube
+# indexed late
+COVERAGE_TTL_SECONDS = 7 * 24 * 3600
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS search_results (
+        keyword TEXT NOT NULL,
+        video_id TEXT NOT NULL,
+        channel_name TEXT,
+        video_title TEXT,
+        published_at TEXT NOT NULL,
+        PRIMARY KEY (keyword, video_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS search_results_published ON search_results (keyword, published_at)",
+    """
+    CREATE TABLE IF NOT EXISTS search_coverage (
+        keyword TEXT NOT NULL,
+        range_start TEXT NOT NULL,
+        range_end TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (keyword, range_start)
+    ) WITHOUT ROWID
+    """
+)
+
+
+def _connection():
+    conn = get_connection()
+    ensure_schema(conn, *SCHEMA)
+    return conn
+
+
+def _merge(ranges):
+    merged = []
+    for start, end, fetched_at in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+            merged[-1][2] = min(merged[-1][2], fetched_at)
+        else:
+            merged.append([start, end, fetched_at])
+    return merged
+
+
+# Parts of [start, end) that no fresh coverage of `keyword` includes
+def uncovered(keyword, start, end, ttl=COVERAGE_TTL_SECONDS):
+    rows = _connection().execute(
+        "SELECT range_start, range_end, fetched_at FROM search_coverage "
+        "WHERE keyword = ? AND range_end > ? AND range_start < ? AND fetched_at >= ?",
+        (keyword, start, end, time.time() - ttl)
+    ).fetchall()
+    gaps, cursor = [], start
+    for range_start, range_end, _ in _merge(rows):
+        if range_start > cursor:
+            gaps.append((cursor, min(range_start, end)))
+        cursor = max(cursor, range_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+# Stores results ((video_id, channel_name, video_title, published_at)
+# tuples) and marks [start, end) as covered, merged with the overlapping
+# ranges already stored.
+def store(keyword, results, start, end):
+    now = time.time()
+    conn = _connection()
+    with conn:
+        # Take the write lock before reading the coverage: a deferred
+        # transaction that read first cannot upgrade once another worker has
+        # committed (SQLITE_BUSY_SNAPSHOT, not retried by the busy timeout)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO search_results (keyword, video_id, channel_name, video_title, published_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(keyword, *result) for result in results]
+        )
+        if start >= end:
+            return
+        overlapping = conn.execute(
+            "SELECT range_start, range_end, fetched_at FROM search_coverage "
+            "WHERE keyword = ? AND range_end >= ? AND range_start <= ?",
+            (keyword, start, end)
+        ).fetchall()
+        # Stale coverage is replaced rather than merged, so its age does not carry over
+        fresh = [row for row in overlapping if row[2] >= now - COVERAGE_TTL_SECONDS]
+        # Every stored range touches [start, end), so they merge into one
+        (range_start, range_end, fetched_at), = _merge(fresh + [(start, end, now)])
+        conn.executemany("DELETE FROM search_coverage WHERE keyword = ? AND range_start = ?",
+                         [(keyword, row[0]) for row in overlapping])
+        conn.execute(
+            "INSERT INTO search_coverage (keyword, range_start, range_end, fetched_at) VALUES (?, ?, ?, ?)",
+            (keyword, range_start, range_end, fetched_at)
+        )
+
+
+# Cached results for `keyword` published in [start, end), newest first, as
+# (video_id, channel_name, video_title, published_at) tuples
+def results(keyword, start, end, limit=None):
+    return _connection().execute(
+        "SELECT video_id, channel_name, video_title, published_at FROM search_results "
+        "WHERE keyword = ? AND published_at >= ? AND published_at < ? ORDER BY published_at DESC"
+        + (" LIMIT ?" if limit else ""),
+        (keyword, start, end, limit) if limit else (keyword, start, end)
+    ).fetchall()
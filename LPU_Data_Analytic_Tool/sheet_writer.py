@@ -0,0 +1,172 @@
+from gspread.utils import absolute_range_name, rowcol_to_a1
+from ingest import sheet_values
+import metrics
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _texts(values):
+    return [_text(value) for value in values]
+
+
+def _row_ranges(indexes):
+    # Consecutive row indexes -> [(first, last)]
+    ranges = []
+    for index in sorted(indexes):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ranges
+
+
+# Computes the target grid for `title` from the rows already in the tab and
+# the new frame. Rows are matched on `key`:
+#   - existing rows keep their position and any column the frame does not
+#     have (analyst-added columns stay where they are, at the end)
+#   - in the `manual` columns (filled in by hand, the frame only has blank
+#     placeholders) a blank new value never overwrites a filled cell; in
+#     every other column the frame's value is written, blank or not
+#   - rows whose key is no longer in the frame are removed if remove_missing
+#   - new keys are appended at the bottom
+#   - the `serial` column, if any, is renumbered 1..n over the final rows,
+#     so rows kept from earlier runs and new ones never share a number
+# Returns (header, final rows, existing row positions to delete). Final rows
+# hold typed values from the frame and the sheet's values for kept cells.
+def plan_upsert(existing, df, key, remove_missing=True, manual=(), serial=None):
+    columns = df.columns.tolist()
+    header = existing[0] if existing else []
+    target = columns + [column for column in header if column and column not in columns]
+    old_rows = existing[1:]
+    old_position = {name: i for i, name in enumerate(header)}
+
+    new_rows = {}
+    for values in sheet_values(df):
+        record = dict(zip(columns, values))
+        new_rows.setdefault(_text(record[key]), record)
+
+    key_position = old_position.get(key)
+    final, removed, seen = [], [], set()
+    for position, row in enumerate(old_rows):
+        row_key = _text(row[key_position]) if key_position is not None and key_position < len(row) else ""
+        record = new_rows.get(row_key) if row_key not in seen else None
+        if record is None and remove_missing:
+            removed.append(position)
+            continue
+        seen.add(row_key)
+        merged = []
+        for column in target:
+            old = row[old_position[column]] if column in old_position and old_position[column] < len(row) else ""
+            new = record.get(column, old) if record is not None else old
+            merged.append(old if column in manual and _text(new) == "" and old != "" else new)
+        final.append(merged)
+    for row_key, record in new_rows.items():
+        if row_key not in seen:
+            final.append([record.get(column, "") for column in target])
+    if serial in target:
+        position = target.index(serial)
+        for number, row in enumerate(final, 1):
+            row[position] = number
+    return target, final, removed
+
+
+# Collects upserts for several tabs of one spreadsheet and applies them as
+# a single transaction:
+#   1 metadata read (sh.worksheets), 1 values.batchGet for all existing tabs,
+#   1 spreadsheets.batchUpdate (new tabs, row deletions, grid growth) and
+#   1 values.batchUpdate with every changed or new row range.
+class SheetBatch:
+    def __init__(self, sh):
+        self.sh = sh
+        self.tabs = []
+
+    def upsert(self, title, df, key, remove_missing=True, manual=(), serial=None):
+        self.tabs.append((title, df, key, remove_missing, manual, serial))
+
+    # Cells are read unformatted (numbers, date serials, 0.25 for 25%), so the
+    # kept cells written back RAW keep their values and the tab's formats
+    # still apply, instead of turning into their display text
+    def _read(self, worksheets):
+        titles = [title for title, *_ in self.tabs if title in worksheets]
+        if not titles:
+            return {}
+        response = metrics.call("sheets", "values.batchGet", self.sh.values_batch_get,
+                                [absolute_range_name(title) for title in titles],
+                                params={"valueRenderOption": "UNFORMATTED_VALUE"})
+        return {title: value_range.get("values", []) for title, value_range in zip(titles, response.get("valueRanges", []))}
+
+    # Returns {title: {"rows": n, "new": n, "changed": n, "removed": n}}
+    def commit(self):
+        worksheets = {ws.title: ws for ws in metrics.call("sheets", "spreadsheets.get", self.sh.worksheets, measure=False)}
+        grids = self._read(worksheets)
+        used_ids = {ws.id for ws in worksheets.values()}
+        requests, data, counts = [], [], {}
+
+        for title, df, key, remove_missing, manual, serial in self.tabs:
+            existing = grids.get(title, [])
+            header, final, removed = plan_upsert(existing, df, key, remove_missing, manual, serial)
+
+            ws = worksheets.get(title)
+            if ws is None:
+                sheet_id = max(used_ids | {0}) + 1
+                used_ids.add(sheet_id)
+                row_count, col_count = max(len(final) + 1, 1000), max(len(header), 20)
+                requests.append({"addSheet": {"properties": {
+                    "sheetId": sheet_id, "title": title,
+                    "gridProperties": {"rowCount": row_count, "columnCount": col_count}
+                }}})
+            else:
+                sheet_id, row_count, col_count = ws.id, ws.row_count, ws.col_count
+
+            for first, last in reversed(_row_ranges(removed)):
+                requests.append({"deleteDimension": {"range": {
+                    "sheetId": sheet_id, "dimension": "ROWS", "startIndex": first + 1, "endIndex": last + 2
+                }}})
+            row_count -= len(removed)
+            if len(final) + 1 > row_count:
+                requests.append({"appendDimension": {"sheetId": sheet_id, "dimension": "ROWS", "length": len(final) + 1 - row_count}})
+            if len(header) > col_count:
+                requests.append({"appendDimension": {"sheetId": sheet_id, "dimension": "COLUMNS", "length": len(header) - col_count}})
+
+            # Grid as it looks after the deletions, to diff row by row
+            remaining = set(range(len(existing) - 1)) - set(removed)
+            current = [existing[0] if existing else []] + [existing[i + 1] for i in sorted(remaining)]
+            grid = [header] + final
+            changed = [
+                i for i, row in enumerate(grid)
+                if i >= len(current) or _texts(row) != _texts((current[i] + [""] * len(row))[:len(row)])
+            ]
+            # Analyst-added columns are only rewritten when the header moved them;
+            # otherwise writes stop at the frame's own columns and keep their types.
+            width = len(df.columns) if header[:len(current[0])] == current[0] else len(header)
+            for first, last in _row_ranges(changed):
+                data.append({
+                    "range": absolute_range_name(title, f"{rowcol_to_a1(first + 1, 1)}:{rowcol_to_a1(last + 1, width)}"),
+                    "values": [row[:width] for row in grid[first:last + 1]]
+                })
+
+            kept = len(current) - 1
+            counts[title] = {
+                "rows": len(final),
+                "new": len(final) - kept,
+                "changed": sum(1 for i in changed if 1 <= i <= kept),
+                "removed": len(removed)
+            }
+
+        if requests:
+            body = {"requests": requests}
+            metrics.call("sheets", "spreadsheets.batchUpdate", self.sh.batch_update, body, payload=body)
+        if data:
+            body = {"valueInputOption": "RAW", "data": data}
+            metrics.call("sheets", "values.batchUpdate", self.sh.values_batch_update, body, payload=body)
+        self.tabs = []
+        return counts
+
+
+# Diff-based replacement for delete-and-recreate on a single tab.
+def upsert_worksheet(sh, title, df, key, remove_missing=True, manual=(), serial=None):
+    batch = SheetBatch(sh)
+    batch.upsert(title, df, key, remove_missing, manual, serial)
+    return batch.commit()[title]
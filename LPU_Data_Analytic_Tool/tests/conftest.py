@@ -0,0 +1,58 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import clients  # noqa: E402
+import reporting  # noqa: E402
+
+
+# Every test gets its own local database and archive directory
+@pytest.fixture(autouse=True)
+def local_paths(tmp_path, monkeypatch):
+    monkeypatch.setenv("LPU_LOCAL_DB", str(tmp_path / "lpu_local.db"))
+    monkeypatch.setenv("LPU_ARCHIVE_DIR", str(tmp_path / "lpu_archive"))
+
+
+class ListSink:
+    def __init__(self):
+        self.messages, self.error = [], None
+
+    def report(self, level, message):
+        self.messages.append((level, message))
+
+    def set_progress(self, fraction, text=None):
+        pass
+
+    def fail(self, reason):
+        self.error = str(reason)
+
+    def text(self):
+        return "\n".join(message for _, message in self.messages)
+
+
+# Collects what a pipeline reports instead of writing it to Streamlit
+@pytest.fixture
+def sink():
+    sink = ListSink()
+    token = reporting.use_sink(sink)
+    yield sink
+    reporting.reset_sink(token)
+
+
+# Installs fake API clients: use_clients(spreadsheet=..., youtube=...)
+@pytest.fixture
+def use_clients():
+    installed = []
+
+    def install(**fakes):
+        for name, fake in fakes.items():
+            clients.set_client_override(name, fake)
+            installed.append(name)
+
+    yield install
+    for name in installed:
+        clients.set_client_override(name, None)
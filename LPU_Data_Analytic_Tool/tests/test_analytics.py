@@ -0,0 +1,37 @@
+import pandas as pd
+import analytics
+
+
+def reels(date, views):
+    return pd.DataFrame({
+        "Reel URL": ["https://www.instagram.com/reel/a/", "https://www.instagram.com/reel/b/"],
+        "Date": pd.to_datetime([date, "2024-07-20"], utc=True),
+        "Username": "u", "Views": [views, 5], "Likes": 1, "Comments": 0, "Shares": 0,
+        "Assigned Type": "campus_reel",
+    })
+
+
+def test_totals_follow_an_item_into_another_month():
+    analytics.update("instagram", reels("2024-05-10", 100), "Assigned Type")
+    analytics.update("instagram", reels("2024-06-02", 100), "Assigned Type")
+    views = analytics.grouped(analytics.totals(), "month")["views"].to_dict()
+    assert views == {"2024-06": 100, "2024-07": 5}
+
+
+def test_updates_bump_the_data_version():
+    before = analytics.data_version()
+    analytics.update("instagram", reels("2024-05-10", 100), "Assigned Type")
+    assert analytics.data_version() == before + 1
+
+
+def test_reading_the_data_version_does_not_write():
+    analytics.data_version()
+    conn = analytics._connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        analytics.data_version()
+        analytics.totals()
+    finally:
+        conn.set_trace_callback(None)
+    assert statements and all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
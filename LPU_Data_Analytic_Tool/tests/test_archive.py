@@ -0,0 +1,39 @@
+import pandas as pd
+import archive
+from fakes import FakeSpreadsheet, FakeYouTube
+from yt_classification import run_yt_classification
+
+
+def videos(*days_ago):
+    now = pd.Timestamp.now(tz="UTC")
+    return pd.DataFrame({
+        "Video URL": [f"https://www.youtube.com/watch?v=v{n}" for n in range(len(days_ago))],
+        "Channel Name": "Channel", "Video Title": "Title",
+        "Publish Date": [(now - pd.Timedelta(days=d)).strftime("%Y-%m-%dT%H:%M:%SZ") for d in days_ago],
+        "Views": "10", "Likes": "2", "Comments": "1",
+    })
+
+
+def test_read_without_archive_keeps_columns():
+    for platform, spec in archive.ARCHIVES.items():
+        df = archive.read(platform, days_back=7)
+        assert df.empty
+        assert spec["key"] in df and spec["date"] in df
+        joined = archive.join_sheet_columns(df, pd.DataFrame({spec["key"]: ["x"], "Assigned Type": ["student"]}), spec["key"])
+        assert joined.empty and "Assigned Type" in joined
+
+
+def test_read_with_nothing_in_window_keeps_columns():
+    archive.append("youtube", videos(40))
+    df = archive.read("youtube", days_back=7)
+    assert df.empty
+    assert list(df.columns) == [*archive.ARCHIVES["youtube"]["columns"], "snapshot_at"]
+    assert len(archive.read("youtube", days_back=60)) == 1
+
+
+def test_classification_from_empty_archive_reports_no_rows(sink, use_clients):
+    use_clients(spreadsheet=FakeSpreadsheet({"Discovered Videos": [["Video URL", "Assigned Type"]]}),
+                youtube=FakeYouTube())
+    run_yt_classification(days_back=7, source="archive")
+    assert sink.error is None
+    assert "archive has no videos" in sink.text()
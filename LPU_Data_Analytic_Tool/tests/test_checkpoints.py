@@ -0,0 +1,45 @@
+import ig_discovery
+from checkpoints import Checkpoint, pending
+from fakes import FakeApify, FakeSpreadsheet
+
+
+def test_resume_loads_the_unfinished_run_with_its_own_params():
+    first = Checkpoint("yt_discovery", {"days_back": 7})
+    first.save("kw:lpu", {"found": 3})
+    started_at, units = pending("yt_discovery")
+    assert units == 1
+
+    resumed = Checkpoint("yt_discovery", {"days_back": 1}, resume=True)
+    assert resumed.resumed and resumed.params == {"days_back": 7}
+    assert resumed.started_at == started_at and resumed.get("kw:lpu") == {"found": 3}
+
+
+def test_a_new_run_discards_the_old_checkpoint_and_finish_clears_it():
+    Checkpoint("yt_discovery", {"days_back": 7}).save("kw:lpu", {"found": 3})
+    fresh = Checkpoint("yt_discovery", {"days_back": 1})
+    assert not fresh.resumed and fresh.units == {} and pending("yt_discovery")[1] == 0
+    fresh.finish()
+    assert pending("yt_discovery") is None
+    assert not Checkpoint("yt_discovery", {"days_back": 1}, resume=True).resumed
+
+
+def test_resumed_discovery_does_not_scrape_finished_runs_again(sink, use_clients, monkeypatch):
+    apify = FakeApify(posts_per_source=5, days=3)
+    sheet = FakeSpreadsheet({"IG Input Pages": [["Profile URL"], ["https://www.instagram.com/creator/"]]})
+    use_clients(apify=apify, spreadsheet=sheet)
+    write = ig_discovery.upsert_worksheet
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("sheet unavailable")
+
+    monkeypatch.setattr(ig_discovery, "upsert_worksheet", fail)
+    ig_discovery.run_ig_discovery(days_back=7)
+    assert "sheet unavailable" in sink.error
+    scraped = apify.calls["actor.start"]
+    assert pending("ig_discovery")[1] == scraped
+
+    monkeypatch.setattr(ig_discovery, "upsert_worksheet", write)
+    ig_discovery.run_ig_discovery(days_back=7, resume=True)
+    assert apify.calls["actor.start"] == scraped
+    assert len(sheet.worksheet("Discovered IG Reels").values) == 1 + 5 * scraped
+    assert pending("ig_discovery") is None
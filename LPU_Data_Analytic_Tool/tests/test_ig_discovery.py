@@ -0,0 +1,32 @@
+from fakes import FakeApify, FakeSpreadsheet
+from discovery_state import get_watermarks
+from ig_discovery import make_attributor, run_ig_discovery
+from local_store import get_connection
+
+PROFILES = ["https://www.instagram.com/alpha/", "https://www.instagram.com/Beta", "https://www.instagram.com/gamma/?hl=en"]
+
+
+def test_items_are_attributed_by_input_url_then_owner_username():
+    attribute = make_attributor(PROFILES)
+    assert attribute({"inputUrl": "https://www.instagram.com/alpha"}) == PROFILES[0]
+    assert attribute({"inputUrl": "https://www.instagram.com/BETA/"}) == PROFILES[1]
+    assert attribute({"ownerUsername": "Gamma"}) == PROFILES[2]
+    # The input URL wins over the post's owner (e.g. a collaboration post)
+    assert attribute({"inputUrl": PROFILES[0], "ownerUsername": "beta"}) == PROFILES[0]
+    assert attribute({"inputUrl": "https://www.instagram.com/other/", "ownerUsername": "other"}) is None
+
+
+def test_a_batched_profile_run_credits_each_profile(sink, use_clients):
+    profiles = [f"https://www.instagram.com/creator{n}/" for n in range(3)]
+    apify = FakeApify(posts_per_source=5, days=3)
+    sheet = FakeSpreadsheet({"IG Input Pages": [["Profile URL"], *[[url] for url in profiles]]})
+    use_clients(apify=apify, spreadsheet=sheet)
+    run_ig_discovery(days_back=7, profile_batch_size=10)
+    assert sink.error is None
+    # One actor run for the three profiles, one per hashtag
+    assert apify.calls["actor.start"] == 1 + 8
+    assert set(get_watermarks("instagram", profiles)) == set(profiles)
+    sources = dict(get_connection().execute("SELECT content_id, source FROM seen_content WHERE source LIKE 'https://%'"))
+    for n, url in enumerate(profiles):
+        reels = [reel for reel, source in sources.items() if source == url]
+        assert len(reels) == 5 and all(f"/reel/creator{n}-" in reel for reel in reels)
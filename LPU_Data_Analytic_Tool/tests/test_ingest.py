@@ -0,0 +1,59 @@
+import pandas as pd
+from fakes import FakeSpreadsheet
+from ig_classification import COMPILED_LAYOUTS, DISCOVERED_REELS_SCHEMA, run_ig_classification
+from ingest import coerce_frame, frame_from_values
+from yt_classification import DISCOVERED_VIDEOS_SCHEMA, classify_videos
+
+
+def test_video_dates_are_written_back_as_typed():
+    df = frame_from_values([
+        ["Video URL", "Video Title", "Channel Name", "Publish Date", "Views", "Likes", "Comments", "Assigned Type"],
+        ["https://www.youtube.com/watch?v=a", "A", "C", "2024-05-01T10:00:00Z", "1", "1", "1", "student"],
+        ["https://www.youtube.com/watch?v=b", "B", "C", "3 May 2024", "1", "1", "1", "student"],
+        ["https://www.youtube.com/watch?v=c", "C", "C", "sometime in May", "1", "1", "1", "student"],
+    ])
+    df, report = coerce_frame(df, DISCOVERED_VIDEOS_SCHEMA, keep_text=["Publish Date"])
+    assert [value for _, _, value, _ in report] == ["sometime in May"]
+    outputs = dict(classify_videos(df, {}))
+    assert list(outputs["Student Youtube Video"]["Publish Date"]) == [
+        "2024-05-01T10:00:00Z", "3 May 2024", "sometime in May"
+    ]
+
+
+def test_archived_video_dates_are_formatted_like_discovery():
+    df = pd.DataFrame({
+        "Video URL": ["https://www.youtube.com/watch?v=a"], "Video Title": ["A"], "Channel Name": ["C"],
+        "Publish Date": pd.to_datetime(["2024-05-01T10:00:00Z"], utc=True),
+        "Views": [1], "Likes": [1], "Comments": [1], "Assigned Type": ["student"],
+    })
+    outputs = dict(classify_videos(df, {}))
+    assert list(outputs["Student Youtube Video"]["Publish Date"]) == ["2024-05-01T10:00:00Z"]
+
+
+def test_reel_dates_are_written_back_as_typed():
+    df = frame_from_values([
+        ["Reel URL", "Username", "Date", "Likes", "Comments", "Views", "Assigned Type"],
+        ["https://www.instagram.com/reel/a/", "u", "2024-05-01", "1", "1", "1", "digital_star"],
+        ["https://www.instagram.com/reel/b/", "u", "05/03/2024 14:20", "1", "1", "1", "digital_star"],
+        ["https://www.instagram.com/reel/c/", "u", "last week", "1", "1", "1", "digital_star"],
+    ])
+    df, _ = coerce_frame(df, DISCOVERED_REELS_SCHEMA, keep_text=["Date"])
+    out = COMPILED_LAYOUTS["Digital Star"](df)
+    assert list(out["Timestamp"]) == ["2024-05-01", "05/03/2024 14:20", "last week"]
+
+
+def test_numbers_in_untyped_columns_are_written_back_as_numbers(sink, use_clients):
+    sheet = FakeSpreadsheet({"Discovered IG Reels": [
+        ["Reel URL", "Username", "Date", "Likes", "Comments", "Views", "Followers", "Amount", "Payment Status",
+         "Assigned Type"],
+        ["https://www.instagram.com/reel/a/", "u", "2024-05-01", "3", "1", "40", "1,200", "99.5", "paid",
+         "chancellor_pr"],
+    ]})
+    use_clients(spreadsheet=sheet)
+    run_ig_classification()
+    assert sink.error is None
+    header, row = sheet.worksheet("Chancellor Sir PR").values
+    written = dict(zip(header, row))
+    assert written["Followers"] == 1200 and isinstance(written["Followers"], int)
+    assert written["Amount to Be Paid (INR)"] == 99.5
+    assert written["Payment Status"] == "paid"
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+import jobs
+import reporting
+from local_store import ensure_schema, get_connection
+
+
+def hold_lock(name, pid):
+    conn = get_connection()
+    ensure_schema(conn, *jobs.SCHEMA)
+    with conn:
+        conn.execute("INSERT INTO job_locks (name, job_id, host, pid, acquired_at) VALUES (?, 'other', ?, ?, "
+                     "'2024-05-01T10:00:00')", (name, jobs.HOST, pid))
+
+
+def locks():
+    return get_connection().execute("SELECT name, pid FROM job_locks").fetchall()
+
+
+def test_submit_refuses_while_another_process_runs_the_pipeline():
+    hold_lock("yt_discovery", os.getppid())
+    with pytest.raises(jobs.PipelineBusy) as busy:
+        jobs.submit("yt_discovery", lambda: None)
+    assert busy.value.pid == os.getppid()
+    assert not jobs.active_jobs("yt_discovery")
+
+
+def test_lock_of_a_dead_process_is_taken_over_and_released():
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    hold_lock("yt_discovery", dead.pid)
+    job, started = jobs.submit("yt_discovery", lambda: None)
+    assert started
+    assert job.wait(timeout=10) and job.status == jobs.SUCCEEDED
+    assert locks() == []
+
+
+def test_lock_is_held_while_the_job_runs():
+    release = threading.Event()
+    job, started = jobs.submit("ig_discovery", release.wait)
+    try:
+        assert started
+        assert locks() == [("ig_discovery", os.getpid())]
+        assert jobs.submit("ig_discovery", lambda: None) == (job, False)
+    finally:
+        release.set()
+    assert job.wait(timeout=10) and job.status == jobs.SUCCEEDED
+    assert locks() == []
+
+
+def test_job_runs_in_the_background_and_is_recorded():
+    def pipeline(days_back):
+        reporting.info(f"looking back {days_back} days")
+        reporting.progress(0.5, "halfway")
+
+    job, started = jobs.submit("yt_classification", pipeline, days_back=3)
+    assert started and jobs.get_job(job.id) is job
+    assert job.wait(timeout=10)
+    assert job.status == jobs.SUCCEEDED and job.progress == 0.5
+    assert ("info", "looking back 3 days") in job.get_messages()
+    run = jobs.last_run("yt_classification")
+    assert run["job_id"] == job.id and run["status"] == jobs.SUCCEEDED and run["params"] == {"days_back": 3}
+
+
+def test_failing_job_is_marked_failed():
+    def pipeline():
+        raise ValueError("no sheet")
+
+    job, _ = jobs.submit("ig_classification", pipeline)
+    assert job.wait(timeout=10)
+    assert job.status == jobs.FAILED and job.error == "no sheet"
+    assert jobs.last_run("ig_classification")["error"] == "no sheet"
+    assert not jobs.active_jobs("ig_classification")
+
+
+def test_one_active_job_per_pipeline_whatever_its_params():
+    release = threading.Event()
+    job, _ = jobs.submit("yt_discovery", lambda days_back: release.wait(), days_back=1)
+    try:
+        other, started = jobs.submit("yt_discovery", lambda days_back: None, days_back=30)
+        assert other is job and not started
+        assert jobs.active_jobs("yt_discovery") == [job]
+    finally:
+        release.set()
+    assert job.wait(timeout=10)
+    again, started = jobs.submit("yt_discovery", lambda days_back: None, days_back=30)
+    assert started and again is not job
+    again.wait(timeout=10)
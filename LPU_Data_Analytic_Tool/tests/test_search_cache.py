@@ -0,0 +1,45 @@
+import threading
+import search_cache
+
+START, END = "2024-01-01T00:00:00Z", "2024-01-08T00:00:00Z"
+
+
+def test_concurrent_store_with_empty_results(monkeypatch):
+    # The empty store pauses between reading the coverage and writing it
+    # while the other worker commits; the write must still go through.
+    merge = search_cache._merge
+    paused, other_done = threading.Event(), threading.Event()
+
+    def pausing_merge(ranges):
+        if threading.current_thread().name == "empty":
+            paused.set()
+            other_done.wait(timeout=1)
+        return merge(ranges)
+
+    monkeypatch.setattr(search_cache, "_merge", pausing_merge)
+    errors = []
+
+    def store(keyword, results):
+        try:
+            if keyword == "full":
+                paused.wait(timeout=5)
+            search_cache.store(keyword, results, START, END)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if keyword == "full":
+                other_done.set()
+
+    workers = [
+        threading.Thread(target=store, args=("empty", []), name="empty"),
+        threading.Thread(target=store, args=("full", [("vid1", "Channel", "Title", "2024-01-02T00:00:00Z")])),
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert errors == []
+    assert search_cache.uncovered("empty", START, END) == []
+    assert search_cache.uncovered("full", START, END) == []
+    assert search_cache.results("full", START, END) == [("vid1", "Channel", "Title", "2024-01-02T00:00:00Z")]
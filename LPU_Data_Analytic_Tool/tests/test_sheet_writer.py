@@ -0,0 +1,96 @@
+import pandas as pd
+from fakes import FakeSpreadsheet
+from sheet_writer import SheetBatch, plan_upsert, upsert_worksheet
+
+
+def test_numbers_analysts_typed_stay_numbers_on_changed_rows():
+    sheet = FakeSpreadsheet({"Discovered IG Reels": [
+        ["Reel URL", "Views", "Followers", "Points"],
+        ["https://www.instagram.com/reel/a/", 10, 1200, 0.25],
+    ]})
+    # Discovery writes the analyst columns as blank placeholders
+    df = pd.DataFrame({"Reel URL": ["https://www.instagram.com/reel/a/"], "Views": [11], "Followers": "", "Points": ""})
+    result = upsert_worksheet(sheet, "Discovered IG Reels", df, key="Reel URL", manual=["Followers", "Points"])
+    assert result["changed"] == 1
+    assert sheet.worksheet("Discovered IG Reels").values[1] == ["https://www.instagram.com/reel/a/", 11, 1200, 0.25]
+
+
+def test_values_cleared_at_the_source_reach_the_sheet():
+    sheet = FakeSpreadsheet({"Out": [["Link", "Remarks", "Student Name"], ["a", "check", "Asha"]]})
+    df = pd.DataFrame({"Link": ["a"], "Remarks": [""], "Student Name": [""]})
+    upsert_worksheet(sheet, "Out", df, key="Link", manual=["Student Name"])
+    assert sheet.worksheet("Out").values[1] == ["a", "", "Asha"]
+
+
+def test_serials_continue_after_the_rows_already_in_the_sheet():
+    sheet = FakeSpreadsheet({"Out": [["S.No", "Link"], [1, "old-1"], [2, "old-2"]]})
+    # An archive-window run numbers its own rows from 1 and keeps the others
+    df = pd.DataFrame({"S.No": [1, 2], "Link": ["old-2", "new"]})
+    upsert_worksheet(sheet, "Out", df, key="Link", remove_missing=False, serial="S.No")
+    assert sheet.worksheet("Out").values[1:] == [[1, "old-1"], [2, "old-2"], [3, "new"]]
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["Link", "Views"])
+
+
+def test_plan_upsert_updates_in_place_and_appends_new_keys():
+    existing = [["Link", "Views", "Notes"], ["a", "1", "keep me"], ["b", "2", ""]]
+    header, final, removed = plan_upsert(existing, frame([["c", 30], ["a", 10], ["b", 20]]), "Link")
+    assert header == ["Link", "Views", "Notes"]
+    assert final == [["a", 10, "keep me"], ["b", 20, ""], ["c", 30, ""]]
+    assert removed == []
+
+
+def test_plan_upsert_removes_missing_keys_unless_told_to_keep_them():
+    existing = [["Link", "Views"], ["a", "1"], ["b", "2"], ["c", "3"]]
+    _, final, removed = plan_upsert(existing, frame([["b", 20]]), "Link")
+    assert final == [["b", 20]] and removed == [0, 2]
+    _, final, removed = plan_upsert(existing, frame([["b", 20]]), "Link", remove_missing=False)
+    assert final == [["a", "1"], ["b", 20], ["c", "3"]] and removed == []
+
+
+def test_plan_upsert_keeps_the_first_row_of_a_duplicated_key():
+    existing = [["Link", "Views"], ["a", "1"], ["a", "1"]]
+    _, final, removed = plan_upsert(existing, frame([["a", 5], ["a", 6]]), "Link")
+    assert final == [["a", 5]] and removed == [1]
+
+
+def test_plan_upsert_on_a_new_tab_writes_the_frame():
+    header, final, removed = plan_upsert([], frame([["a", 1], ["b", 2]]), "Link")
+    assert header == ["Link", "Views"] and final == [["a", 1], ["b", 2]] and removed == []
+
+
+def test_plan_upsert_adds_new_frame_columns_before_analyst_columns():
+    existing = [["Link", "Notes"], ["a", "n"]]
+    header, final, _ = plan_upsert(existing, frame([["a", 1]]), "Link")
+    assert header == ["Link", "Views", "Notes"] and final == [["a", 1, "n"]]
+
+
+def test_batch_commits_several_tabs_in_one_transaction():
+    sheet = FakeSpreadsheet({"A": [["Link", "Views"], ["a", 1], ["b", 2], ["c", 3]]})
+    written = []
+    write = sheet.values_batch_update
+    sheet.values_batch_update = lambda body: written.append(body) or write(body)
+    batch = SheetBatch(sheet)
+    batch.upsert("A", frame([["a", 1], ["c", 30], ["d", 4]]), "Link")
+    batch.upsert("B", frame([["x", 1]]), "Link")
+    counts = batch.commit()
+    calls = dict(sheet.calls)
+
+    assert counts == {"A": {"rows": 3, "new": 1, "changed": 1, "removed": 1},
+                      "B": {"rows": 1, "new": 1, "changed": 0, "removed": 0}}
+    assert (calls["spreadsheets.get"], calls["values.batchGet"]) == (1, 1)
+    assert (calls["spreadsheets.batchUpdate"], calls["values.batchUpdate"]) == (1, 1)
+    # Row "a" is unchanged and not rewritten
+    assert [data["range"] for data in written[0]["data"]] == ["'A'!A3:B4", "'B'!A1:B2"]
+    assert sheet.worksheet("A").values == [["Link", "Views"], ["a", 1], ["c", 30], ["d", 4]]
+    assert sheet.worksheet("B").values == [["Link", "Views"], ["x", 1]]
+
+
+def test_batch_without_changes_writes_nothing():
+    sheet = FakeSpreadsheet({"A": [["Link", "Views"], ["a", 1]]})
+    batch = SheetBatch(sheet)
+    batch.upsert("A", frame([["a", 1]]), "Link")
+    assert batch.commit() == {"A": {"rows": 1, "new": 0, "changed": 0, "removed": 0}}
+    assert "values.batchUpdate" not in sheet.calls and "spreadsheets.batchUpdate" not in sheet.calls
@@ -0,0 +1,33 @@
+from fakes import FakeYouTube
+from yt_discovery import iter_search_pages
+
+
+def search(youtube, keyword, seen, **kwargs):
+    return list(iter_search_pages(youtube, keyword, None, seen, **kwargs))
+
+
+def test_pages_follow_the_next_page_token_up_to_max_results():
+    youtube = FakeYouTube(videos_per_keyword=120)
+    pages = search(youtube, "lpu", set(), max_results=200, page_size=50)
+    assert [len(page) for page in pages] == [50, 50, 20]
+    assert youtube.calls["search.list"] == 3
+    pages = search(FakeYouTube(videos_per_keyword=120), "lpu", set(), max_results=70, page_size=50)
+    assert [len(page) for page in pages] == [50, 20]
+
+
+def test_videos_are_deduplicated_across_keywords():
+    # The second keyword's first page repeats 25 videos of the first keyword
+    youtube = FakeYouTube(videos_per_keyword=100, overlap=0.25)
+    seen = set()
+    first = [record[0] for page in search(youtube, "lpu", seen) for record in page]
+    second = [record[0] for page in search(youtube, "lpu campus", seen) for record in page]
+    assert len(first) == 100 and len(second) == 75
+    assert not set(first) & set(second)
+    assert len(seen) == 175
+
+
+def test_paging_stops_at_a_page_with_nothing_new():
+    youtube = FakeYouTube(videos_per_keyword=120)
+    seen = {f"vid{n:08d}" for n in range(50)}
+    assert search(youtube, "lpu", seen, max_results=200, page_size=50) == []
+    assert youtube.calls["search.list"] == 1
@@ -0,0 +1,99 @@
+import time
+import isodate
+import metrics
+from concurrency import retry
+from local_store import get_connection, ensure_schema
+
+# How long each part of a video's metadata stays fresh. Counts move every
+# hour; durations practically never change.
+STATS_TTL_SECONDS = 6 * 3600
+DETAILS_TTL_SECONDS = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_metadata (
+    video_id TEXT PRIMARY KEY,
+    views INTEGER,
+    likes INTEGER,
+    comments INTEGER,
+    stats_fetched_at REAL,
+    duration_seconds REAL,
+    details_fetched_at REAL
+) WITHOUT ROWID
+"""
+
+FIELDS = ("video_id", "views", "likes", "comments", "stats_fetched_at", "duration_seconds", "details_fetched_at")
+
+
+def _load(conn, video_ids):
+    records = {}
+    for i in range(0, len(video_ids), 500):
+        chunk = video_ids[i:i+500]
+        rows = conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM video_metadata WHERE video_id IN ({', '.join('?' * len(chunk))})",
+            chunk
+        )
+        for row in rows:
+            records[row[0]] = dict(zip(FIELDS, row))
+    return records
+
+
+def _is_stale(record, fields, now, stats_ttl, details_ttl):
+    if record is None:
+        return True
+    if "statistics" in fields and (record["stats_fetched_at"] or 0) < now - stats_ttl:
+        return True
+    if "contentDetails" in fields and (record["details_fetched_at"] or 0) < now - details_ttl:
+        return True
+    return False
+
+
+# One videos.list call fills both parts; IDs the API no longer returns are
+# stored empty so they are not re-requested until their TTL runs out. Each
+# batch of 50 is saved as soon as it arrives, so a failure later on does not
+# cost the batches already fetched.
+def _fetch(conn, youtube, video_ids, now):
+    fetched = {}
+    for i in range(0, len(video_ids), 50):
+        batch = {vid: dict(zip(FIELDS, (vid, None, None, None, now, None, now))) for vid in video_ids[i:i+50]}
+        response = retry(metrics.call, "youtube", "videos.list", youtube.videos().list(
+            part="statistics,contentDetails",
+            id=",".join(batch)
+        ).execute)
+        for item in response.get("items", []):
+            record = batch[item["id"]]
+            stats = item.get("statistics", {})
+            record["views"] = int(stats.get("viewCount", 0))
+            record["likes"] = int(stats.get("likeCount", 0))
+            record["comments"] = int(stats.get("commentCount", 0))
+            duration = item.get("contentDetails", {}).get("duration")
+            if duration:
+                record["duration_seconds"] = isodate.parse_duration(duration).total_seconds()
+        _save(conn, batch.values())
+        fetched.update(batch)
+    return fetched
+
+
+def _save(conn, records):
+    with conn:
+        conn.executemany(
+            f"INSERT INTO video_metadata ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))}) "
+            "ON CONFLICT(video_id) DO UPDATE SET "
+            + ", ".join(f"{field} = excluded.{field}" for field in FIELDS[1:]),
+            [tuple(record[field] for field in FIELDS) for record in records]
+        )
+
+
+# Returns {video_id: record} for the requested IDs. `fields` names the
+# videos.list parts the caller needs; only IDs missing from the store or
+# stale in one of those parts are fetched from the API.
+def get_video_metadata(youtube, video_ids, fields=("statistics", "contentDetails"),
+                       stats_ttl=STATS_TTL_SECONDS, details_ttl=DETAILS_TTL_SECONDS):
+    conn = get_connection()
+    ensure_schema(conn, SCHEMA)
+    video_ids = list(dict.fromkeys(video_ids))
+    now = time.time()
+    records = _load(conn, video_ids)
+    stale = [vid for vid in video_ids if _is_stale(records.get(vid), fields, now, stats_ttl, details_ttl)]
+    if stale:
+        records.update(_fetch(conn, youtube, stale, now))
+    return records
@@ -1,96 +1,168 @@
+import calendar
+import numpy as np
 import pandas as pd
 from datetime import datetime
-import streamlit as st
-import isodate
-from googleapiclient.discovery import build
-import gspread
-from google.oauth2.service_account import Credentials
-
-def get_gsheet_client():
-    import json
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    info = json.loads(st.secrets["SERVICE_ACCOUNT_JSON"]) 
-    creds = Credentials.from_service_account_info(info, scopes=scope)
-    return gspread.authorize(creds)
+import analytics
+import archive
+import metrics
+import reporting
+from clients import get_spreadsheet, get_youtube
+from ingest import CATEGORY, COUNT, DATETIME, coerce_frame, date_text, read_columns, read_worksheet, summarize_report
+from sheet_writer import SheetBatch
+from video_store import get_video_metadata
 
 def fetch_video_durations(video_ids, youtube):
-    durations = {}
-    for i in range(0, len(video_ids), 50):
-        response = youtube.videos().list(
-            part="contentDetails",
-            id=",".join(video_ids[i:i+50])
-        ).execute()
-        for item in response.get("items", []):
-            video_id = item["id"]
-            duration_str = item["contentDetails"]["duration"]
-            duration = isodate.parse_duration(duration_str).total_seconds()
-            durations[video_id] = duration
-    return durations
+    metadata = get_video_metadata(youtube, video_ids, fields=("contentDetails",))
+    return {
+        video_id: record["duration_seconds"]
+        for video_id, record in metadata.items()
+        if record["duration_seconds"] is not None
+    }
+
+# --- Output sheet layouts ---
+# Each layout lists (output column, field of the columnar frame built in
+# classify_videos); "serial" is numbered per output sheet.
+OUTPUT_SHEETS = [
+    ("Student Youtube Video", [
+        ("S. No.", "serial"), ("Month", "month"), ("Student Name", "blank"), ("Link", "url"),
+        ("Video Title", "title"), ("Publish Date", "date"), ("Channel", "channel"), ("Views", "views"),
+        ("Likes", "likes"), ("Comments", "comments"), ("Shares", "blank"), ("Commercials", "blank"), ("Theme", "blank")
+    ]),
+    ("Youtube Short with Commercials", [
+        ("S.No", "serial"), ("Month", "month"), ("Influencer Name", "blank"), ("Instagram Reel/ Youtube shorts", "url"),
+        ("Video Title", "title"), ("Publish Date", "date"), ("Channel", "channel"), ("Views", "views"),
+        ("Likes", "likes"), ("Comments", "comments"), ("Total Engagement", "engagement"), ("Remarks", "remarks"),
+        ("Commercials", "commercials")
+    ]),
+    ("Youtube Short without Commercials", [
+        ("S.No", "serial"), ("Month", "month"), ("Influencer Name", "blank"), ("Instagram Reel/ Youtube shorts", "url"),
+        ("Video Title", "title"), ("Publish Date", "date"), ("Channel", "channel"), ("Views", "views"),
+        ("Likes", "likes"), ("Comments", "comments"), ("Total Engagement", "engagement")
+    ]),
+    ("CreatorVerse", [
+        ("Link", "url"), ("Caption", "title"), ("Date", "date"), ("Channel", "channel"),
+        ("Views", "views"), ("Likes", "likes"), ("Comments", "comments")
+    ])
+]
+
+# Output column holding the video link, used to match rows on re-runs
+OUTPUT_KEYS = {name: next(column for column, field in layout if field == "url") for name, layout in OUTPUT_SHEETS}
+# Output columns analysts fill in by hand (written blank), and the serial column
+OUTPUT_MANUAL = {name: [column for column, field in layout if field == "blank"] for name, layout in OUTPUT_SHEETS}
+OUTPUT_SERIALS = {name: next((column for column, field in layout if field == "serial"), None)
+                  for name, layout in OUTPUT_SHEETS}
+
+DISCOVERED_VIDEOS_SCHEMA = {
+    "Publish Date": DATETIME,
+    "Views": COUNT,
+    "Likes": COUNT,
+    "Comments": COUNT,
+    "Assigned Type": CATEGORY
+}
+
+# Filled in by analysts on "Discovered Videos", so never in the archive
+ANALYST_COLUMNS = ["Assigned Type", "Remarks", "Commercials"]
+
+# Routes every discovered video to its output sheet in one columnar pass and
+# returns [(sheet name, output frame)] in OUTPUT_SHEETS order. Expects `df`
+# typed by DISCOVERED_VIDEOS_SCHEMA.
+def classify_videos(df, durations):
+    video_ids = df["Video URL"].astype(str).str.split("v=").str[-1]
+    is_short = video_ids.map(durations).fillna(9999) <= 60
+    assigned = df["Assigned Type"]
+    published = df["Publish Date"]
+    fields = pd.DataFrame({
+        "month": published.dt.month.map(dict(enumerate(calendar.month_abbr))).fillna(""),
+        "blank": "",
+        "url": df["Video URL"],
+        "title": df["Video Title"],
+        "date": date_text(df, "Publish Date", "%Y-%m-%dT%H:%M:%SZ"),
+        "channel": df["Channel Name"],
+        "views": df["Views"],
+        "likes": df["Likes"],
+        "comments": df["Comments"],
+        "engagement": df["Likes"].fillna(0) + df["Comments"].fillna(0),
+        "remarks": df["Remarks"] if "Remarks" in df else "",
+        "commercials": df["Commercials"] if "Commercials" in df else ""
+    }, index=df.index)
+
+    sheet = pd.Series(np.select(
+        [
+            assigned == "student",
+            (assigned == "influencer_commercial") & is_short,
+            (assigned == "influencer_noncommercial") & is_short,
+            assigned == "creatorverse"
+        ],
+        [name for name, _ in OUTPUT_SHEETS],
+        default=""
+    ), index=df.index)
+    fields["serial"] = fields.groupby(sheet).cumcount() + 1
+    positions = fields.groupby(sheet, sort=False).indices
 
-def run_yt_classification(days_back: int):
+    outputs = []
+    for name, layout in OUTPUT_SHEETS:
+        part = fields.iloc[positions.get(name, [])][[field for _, field in layout]]
+        outputs.append((name, part.set_axis([column for column, _ in layout], axis=1).reset_index(drop=True)))
+    return outputs
+
+# source="sheet" classifies everything on "Discovered Videos". source="archive"
+# classifies the videos published in the last days_back days from the local
+# archive and only downloads the URL and analyst columns of the sheet; the
+# output tabs then keep the rows of videos outside that window.
+def run_yt_classification(days_back: int, source: str = "sheet"):
     log = []
     try:
-        log.append("📊 Running YouTube Classification...")
-        YOUTUBE_API_KEY = st.secrets["YOUTUBE_API_KEY"]
-        youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-        client = get_gsheet_client()
-        sheet_name = st.secrets["GOOGLE_SHEET_NAME"]
-        sh = client.open(sheet_name)
-        df = pd.DataFrame(sh.worksheet("Discovered Videos").get_all_records())
+        log.append(f"📊 Running YouTube Classification (from the {source})...")
+        if source == "archive":
+            with metrics.stage("archive read"):
+                archived = archive.read("youtube", days_back)
+            if archived.empty:
+                log.append(f"⚠️ The archive has no videos from the last {days_back} days — nothing to classify")
+                return
+        youtube = get_youtube()
+        sh = get_spreadsheet()
+        with metrics.stage("sheet read"):
+            ws = metrics.call("sheets", "worksheet", sh.worksheet, "Discovered Videos", measure=False)
+            if source == "archive":
+                analyst = read_columns(ws, ["Video URL", *ANALYST_COLUMNS])
+            else:
+                df, report = read_worksheet(ws, DISCOVERED_VIDEOS_SCHEMA, keep_text=["Publish Date"])
+        if source == "archive":
+            df = archive.join_sheet_columns(archived, analyst, "Video URL")
+            df, report = coerce_frame(df, {"Assigned Type": CATEGORY})
+            log.append(f"🗄️ {len(df)} archived videos from the last {days_back} days")
+        log.extend(summarize_report(report))
 
         required_cols = ["Video URL", "Video Title", "Channel Name", "Publish Date", "Views", "Likes", "Comments", "Assigned Type"]
         for col in required_cols:
             if col not in df.columns:
-                st.error(f"Missing column: {col}")
+                reporting.error(f"Missing column: {col}")
                 return
 
         video_ids = [url.split("v=")[-1] for url in df["Video URL"]]
-        durations = fetch_video_durations(video_ids, youtube)
-        df["Seconds"] = df["Video URL"].apply(lambda url: durations.get(url.split("v=")[-1], 9999))
-        df["IsShort"] = df["Seconds"] <= 60
-
-        # --- Prepare Output DataFrames ---
-        columns_student = ["S. No.", "Month", "Student Name", "Link", "Video Title", "Publish Date", "Channel", "Views", "Likes", "Comments", "Shares", "Commercials", "Theme"]
-        columns_comm = ["S.No", "Month", "Influencer Name", "Instagram Reel/ Youtube shorts", "Video Title", "Publish Date", "Channel", "Views", "Likes", "Comments", "Total Engagement", "Remarks", "Commercials"]
-        columns_noncomm = ["S.No", "Month", "Influencer Name", "Instagram Reel/ Youtube shorts", "Video Title", "Publish Date", "Channel", "Views", "Likes", "Comments", "Total Engagement"]
-        columns_creatorverse = ["Link", "Caption", "Date", "Channel", "Views", "Likes", "Comments"]
-
-        student_rows, comm_rows, noncomm_rows, creator_rows = [], [], [], []
-        
-        for i, row in df.iterrows():
-            url, title, channel, date = row["Video URL"], row["Video Title"], row["Channel Name"], row["Publish Date"]
-            views, likes, comments = row["Views"], row["Likes"], row["Comments"]
-            assigned = str(row["Assigned Type"]).strip().lower()
-            month = pd.to_datetime(date).strftime("%b")
-            engagement = (int(likes) if pd.notnull(likes) else 0) + (int(comments) if pd.notnull(comments) else 0)
+        with metrics.stage("durations"):
+            durations = fetch_video_durations(video_ids, youtube)
+        with metrics.stage("classify"):
+            sheets_to_upload = classify_videos(df, durations)
 
-            if assigned == "student":
-                student_rows.append([len(student_rows)+1, month, "", url, title, date, channel, views, likes, comments, "", "", ""])
-            elif assigned == "influencer_commercial" and row["IsShort"]:
-                comm_rows.append([len(comm_rows)+1, month, "", url, title, date, channel, views, likes, comments, engagement, row.get("Remarks", ""), row.get("Commercials", "")])
-            elif assigned == "influencer_noncommercial" and row["IsShort"]:
-                noncomm_rows.append([len(noncomm_rows)+1, month, "", url, title, date, channel, views, likes, comments, engagement])
-            elif assigned == "creatorverse":
-                creator_rows.append([url, title, date, channel, views, likes, comments])
-
-        sheets_to_upload = [
-            ("Student Youtube Video", columns_student, student_rows),
-            ("Youtube Short with Commercials", columns_comm, comm_rows),
-            ("Youtube Short without Commercials", columns_noncomm, noncomm_rows),
-            ("CreatorVerse", columns_creatorverse, creator_rows)
-        ]
+        batch = SheetBatch(sh)
+        for name, out_df in sheets_to_upload:
+            batch.upsert(name, out_df, key=OUTPUT_KEYS[name], remove_missing=source == "sheet",
+                         manual=OUTPUT_MANUAL[name], serial=OUTPUT_SERIALS[name])
+        with metrics.stage("sheet write"):
+            results = batch.commit()
+        for name, result in results.items():
+            log.append(f"✅ Updated sheet: {name} — {result['rows']} rows ({result['new']} new, {result['changed']} changed, {result['removed']} removed)")
+        log.append("✅ All 4 sheets uploaded to 'YouTube Performance Report'")
 
-        for name, columns, rows in sheets_to_upload:
+        with metrics.stage("analytics"):
             try:
-                sh.del_worksheet(sh.worksheet(name))
-            except:
-                pass
-            ws = sh.add_worksheet(title=name, rows="1000", cols="20")
-            ws.update([columns] + rows)
-            log.append(f"✅ Updated sheet: {name}")
-        log.append("✅ All 4 sheets uploaded to 'YouTube Performance Report'")
+                analytics.update("youtube", df, "Assigned Type")
+            except Exception as e:
+                log.append(f"⚠️ Could not update the analytics tables — {e}")
     except Exception as e:
         log.append(f"❌ Error: {str(e)}")
+        reporting.mark_failed(e)
     finally:
         for entry in log:
-            st.write(entry)
+            reporting.write(entry)
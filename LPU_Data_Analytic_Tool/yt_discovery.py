@@ -1,28 +1,120 @@
-import pandas as pd
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-import streamlit as st
-from googleapiclient.discovery import build
-import gspread
-from google.oauth2.service_account import Credentials
-
-def get_gsheet_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    # IMPORTANT: SERVICE_ACCOUNT_JSON must have escaped newlines (\n), not actual line breaks!
-    info = json.loads(st.secrets["SERVICE_ACCOUNT_JSON"])
-    creds = Credentials.from_service_account_info(info, scopes=scope)
-    return gspread.authorize(creds)
-
-def run_yt_discovery(days_back: int):
+import archive
+import metrics
+import reporting
+import search_cache
+from checkpoints import Checkpoint
+from clients import get_spreadsheet, get_youtube
+from concurrency import RateLimiter, retry, submit_in_context
+from video_store import get_video_metadata
+from records import VIDEO_SCHEMA, VIDEO_STATS_SCHEMA, RecordBuffer, with_placeholders
+from discovery_state import advance_watermarks, get_watermarks, mark_seen, seen_since
+from sheet_writer import upsert_worksheet
+
+# Streams search result pages (lists of records.VIDEO_SCHEMA records) for
+# one keyword, following nextPageToken.
+# Only videos not yet in `seen_ids` are yielded; paging stops once
+# `max_results` new videos were kept or a page brings nothing new.
+def iter_search_pages(youtube, keyword, published_after, seen_ids, seen_lock=None,
+                      max_results=100, page_size=50, throttle=None, order="relevance", published_before=None):
+    seen_lock = seen_lock or threading.Lock()
+    kept, page_token = 0, None
+    while kept < max_results:
+        if throttle:
+            throttle()
+        response = retry(metrics.call, "youtube", "search.list", youtube.search().list(
+            part="snippet",
+            maxResults=min(page_size, 50),
+            q=keyword,
+            type="video",
+            order=order,
+            publishedAfter=published_after,
+            publishedBefore=published_before,
+            pageToken=page_token
+        ).execute)
+        page = []
+        for item in response.get("items", []):
+            video_id = item["id"]["videoId"]
+            with seen_lock:
+                if video_id in seen_ids:
+                    continue
+                seen_ids.add(video_id)
+            snippet = item["snippet"]
+            page.append((f"https://www.youtube.com/watch?v={video_id}", snippet["channelTitle"], snippet["title"],
+                         snippet["publishedAt"]))
+            if kept + len(page) >= max_results:
+                break
+        if not page:
+            return
+        kept += len(page)
+        yield page
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+# Columns analysts fill in on "Discovered Videos" (with their initial values)
+SHEET_PLACEHOLDERS = {"Assigned Type": "", "Remarks": ""}
+
+def parse_publish_date(value):
+    # "2024-05-01T10:00:00Z" -> naive UTC datetime
+    return datetime.fromisoformat(value.replace("Z", ""))
+
+def format_publish_date(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# Brings the search cache up to date for keyword over [start, end): only the
+# ranges no earlier search covered are searched, newest first, so a search
+# cut off at max_results still covers back to its oldest result. Returns
+# (ranges searched, True if one of them was cut off).
+def refresh_search_cache(youtube, keyword, start, end, max_results, throttle=None, ttl=search_cache.COVERAGE_TTL_SECONDS):
+    searched, capped = 0, False
+    for gap_start, gap_end in search_cache.uncovered(keyword, start, end, ttl):
+        found = []
+        for page in iter_search_pages(youtube, keyword, gap_start, set(), max_results=max_results,
+                                      throttle=throttle, order="date", published_before=gap_end):
+            found.extend(page)
+        covered_from = gap_start
+        if len(found) >= max_results:
+            covered_from, capped = min(published for *_, published in found), True
+        search_cache.store(keyword, [(url.split("v=")[-1], channel, title, published)
+                                     for url, channel, title, published in found], covered_from, gap_end)
+        searched += 1
+    return searched, capped
+
+# With incremental=True (the default) each keyword is only searched from its
+# watermark (newest video found by an earlier run) onwards, videos found
+# before are skipped and only the new ones are added to the tab. With
+# incremental=False the whole window is searched and the tab is replaced.
+# Searches are answered from the search cache where earlier runs already
+# covered the window; use_search_cache=False searches the API for all of it.
+# Every finished keyword search is checkpointed (stats batches are kept in
+# video_store as they arrive); resume=True continues the last run that did
+# not complete, over its original window, without searching those again.
+def run_yt_discovery(days_back: int, max_workers: int = 4, requests_per_second: float = 5.0,
+                     max_results_per_keyword: int = 100, incremental: bool = True, use_search_cache: bool = True,
+                     resume: bool = False):
     log = []
     try:
-        log.append(f"🔎 Running YouTube Discovery for last {days_back} days...")
+        checkpoint = Checkpoint("yt_discovery", {
+            "days_back": days_back, "incremental": incremental, "window_end": format_publish_date(datetime.utcnow())
+        }, resume)
+        days_back, incremental = checkpoint.params["days_back"], checkpoint.params["incremental"]
+        mode = "new videos only" if incremental else "full window"
+        log.append(f"🔎 Running YouTube Discovery for last {days_back} days ({mode})...")
+        if checkpoint.resumed:
+            log.append(f"♻️ Resuming the run started {checkpoint.started_at:%Y-%m-%d %H:%M} UTC "
+                       f"({len(checkpoint.units)} keywords already searched)")
+        elif resume:
+            log.append("♻️ No unfinished run to resume, starting a new one")
+
+        # Auth YouTube (search workers each get their own thread's service)
+        youtube = get_youtube()
+        limiter = RateLimiter(requests_per_second)
+        window_end = parse_publish_date(checkpoint.params["window_end"])
+        window_start = window_end - timedelta(days=days_back)
 
-        # Auth YouTube
-        YOUTUBE_API_KEY = st.secrets["YOUTUBE_API_KEY"]
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        published_after = (datetime.utcnow() - timedelta(days=days_back)).isoformat("T") + "Z"
-        
         # Keywords
         keywords = [
             '"Lovely Professional University"',
@@ -37,77 +129,107 @@ def run_yt_discovery(days_back: int):
             '"Studying at LPU"'
         ]
 
-        # Search YouTube
+        # Search YouTube; pages are deduplicated across all keywords (and, when
+        # incremental, against every video discovered before) as they arrive
+        watermarks = get_watermarks("youtube", keywords) if incremental else {}
+        seen_ids = seen_since("youtube", window_start) if incremental else set()
+        seen_lock = threading.Lock()
+        known = len(seen_ids)
+
+        # Results come from the search cache, newest first. A keyword whose
+        # window was fully searched and that stayed below the cap has been
+        # covered up to now, so its watermark can move on.
         def search_youtube(keyword):
+            start = format_publish_date(max(window_start, watermarks.get(keyword, window_start)))
+            end = format_publish_date(window_end)
+            searched, capped = refresh_search_cache(get_youtube(), keyword, start, end, max_results_per_keyword,
+                                                    throttle=limiter.wait,
+                                                    ttl=search_cache.COVERAGE_TTL_SECONDS if use_search_cache else 0)
             results = []
-            request = youtube.search().list(
-                part="snippet",
-                maxResults=25,
-                q=keyword,
-                type="video",
-                order="relevance",
-                publishedAfter=published_after
-            )
-            response = request.execute()
-            for item in response["items"]:
-                video_id = item["id"]["videoId"]
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                snippet = item["snippet"]
-                results.append({
-                    "Video URL": video_url,
-                    "Channel Name": snippet["channelTitle"],
-                    "Video Title": snippet["title"],
-                    "Publish Date": snippet["publishedAt"]
-                })
-            return results
-        
-        all_results = []
-        for kw in keywords:
-            all_results.extend(search_youtube(kw))
-        
-        df = pd.DataFrame(all_results).drop_duplicates(subset="Video URL")
-        log.append(f"✅ Discovered {len(df)} unique videos.")
-
-        # Stats
+            for video_id, channel, title, published in search_cache.results(keyword, start, end):
+                with seen_lock:
+                    if video_id in seen_ids:
+                        continue
+                    seen_ids.add(video_id)
+                results.append((f"https://www.youtube.com/watch?v={video_id}", channel, title, published))
+                if len(results) >= max_results_per_keyword:
+                    capped = True
+                    break
+            # Saved from the worker, so keywords finishing after another failed are kept too
+            checkpoint.save(f"search:{keyword}", {"results": results, "complete": not capped, "searched": searched})
+            return results, not capped, searched
+
+        videos, sources, covered, from_cache = RecordBuffer(VIDEO_SCHEMA), [], {}, 0
+
+        def merge(keyword, results, complete, searched):
+            nonlocal from_cache
+            from_cache += not searched
+            videos.extend(results)
+            sources.extend([keyword] * len(results))
+            if complete and results:
+                covered[keyword] = parse_publish_date(max(published for *_, published in results))
+
+        # Keywords a resumed run already searched come from the checkpoint
+        restored = {kw: checkpoint.get(f"search:{kw}") for kw in keywords if checkpoint.get(f"search:{kw}")}
+        for keyword, unit in restored.items():
+            seen_ids.update(url.split("v=")[-1] for url, *_ in unit["results"])
+            merge(keyword, unit["results"], unit["complete"], unit["searched"])
+
+        # Merge each keyword's results as soon as its search returns
+        with metrics.stage("search"), ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {submit_in_context(pool, search_youtube, kw): kw for kw in keywords if kw not in restored}
+            for done, future in enumerate(as_completed(futures), len(restored) + 1):
+                reporting.progress(done / len(keywords), f"Searched {done}/{len(keywords)} keywords")
+                merge(futures[future], *future.result())
+
+        df = videos.to_frame()
+        if incremental:
+            log.append(f"✅ Discovered {len(df)} new videos ({known} already known in this window).")
+        else:
+            log.append(f"✅ Discovered {len(df)} unique videos.")
+        log.append(f"🗄️ {from_cache}/{len(keywords)} keywords answered from the search cache without API calls.")
+
+        # Stats (served from the local metadata store, API only for missing/stale IDs)
         def get_video_stats(video_ids):
-            stats_data = []
-            for i in range(0, len(video_ids), 50):
-                request = youtube.videos().list(
-                    part="statistics",
-                    id=",".join(video_ids[i:i+50])
-                )
-                response = request.execute()
-                for item in response["items"]:
-                    stats = item.get("statistics", {})
-                    stats_data.append({
-                        "Video URL": f"https://www.youtube.com/watch?v={item['id']}",
-                        "Views": int(stats.get("viewCount", 0)),
-                        "Likes": int(stats.get("likeCount", 0)),
-                        "Comments": int(stats.get("commentCount", 0))
-                    })
-            return pd.DataFrame(stats_data)
-
-        video_ids = [url.split("v=")[-1] for url in df["Video URL"]]
-        stats_df = get_video_stats(video_ids)
+            metadata = get_video_metadata(youtube, video_ids, fields=("statistics",))
+            stats = RecordBuffer(VIDEO_STATS_SCHEMA)
+            for video_id, record in metadata.items():
+                if record["views"] is not None:
+                    stats.append((f"https://www.youtube.com/watch?v={video_id}",
+                                  record["views"], record["likes"], record["comments"]))
+            return stats.to_frame()
+
+        video_ids = [url.split("v=")[-1] for url in videos.column("Video URL")]
+        with metrics.stage("stats"):
+            stats_df = get_video_stats(video_ids)
         df_final = df.merge(stats_df, on="Video URL", how="left")
-        df_final["Assigned Type"] = ""
-        df_final["Remarks"] = ""
 
         # Google Sheets
-        client = get_gsheet_client()
-        sheet_name = st.secrets["GOOGLE_SHEET_NAME"]
-        sh = client.open(sheet_name)
-        try:
-            worksheet = sh.worksheet("Discovered Videos")
-            sh.del_worksheet(worksheet)
-        except Exception:
-            pass
-        worksheet = sh.add_worksheet(title="Discovered Videos", rows="1000", cols="20")
-        worksheet.update([df_final.columns.tolist()] + df_final.values.tolist())
-        log.append("✅ Sheet updated: 'YouTube Performance Report' > 'Discovered Videos'")
+        with metrics.stage("sheet write"):
+            sh = get_spreadsheet()
+            result = upsert_worksheet(sh, "Discovered Videos", with_placeholders(df_final, SHEET_PLACEHOLDERS),
+                                      key="Video URL", remove_missing=not incremental, manual=list(SHEET_PLACEHOLDERS))
+
+        # Only remembered once they are in the sheet, so a failed write is retried next run
+        with metrics.stage("state update"):
+            mark_seen("youtube", [
+                (video_id, keyword, parse_publish_date(published))
+                for video_id, keyword, published in zip(video_ids, sources, videos.column("Publish Date"))
+            ])
+            advance_watermarks("youtube", covered)
+            checkpoint.finish()
+        log.append(f"✅ Sheet updated: 'YouTube Performance Report' > 'Discovered Videos' ({result['new']} new, {result['changed']} changed, {result['removed']} removed)")
+
+        # The sheet stays the source of truth, so a failed archive write only warns
+        with metrics.stage("archive"):
+            try:
+                archive.append("youtube", df_final)
+            except Exception as e:
+                log.append(f"⚠️ Could not archive this run — {e}")
 
     except Exception as e:
         log.append(f"❌ Error: {str(e)}")
+        reporting.mark_failed(e)
     finally:
         for entry in log:
-            st.write(entry)
+            reporting.write(entry)